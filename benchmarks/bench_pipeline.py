@@ -0,0 +1,80 @@
+"""
+Compara el modo serial contra el modo pipeline de fact_inventario.py usando
+un Odoo simulado (XML-RPC local con latencia) y un SQL Server simulado.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_pipeline [--lineas 1000] [--latencia-odoo 0.002] [--latencia-sql 0.001]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import fact_inventario
+from benchmarks.odoo_stub import OdooStub, CursorSimulado, ConexionSimulada, generar_lineas
+from odoo_streaming import ClienteOdooStreaming
+from indice_costos import construir_indice_costos, productos_en_ventana
+from pipeline import ejecutar_pipeline
+
+DB = 'bench'
+PASSWORD = 'bench'
+
+
+def ejecutar(modo, url, latencia_sql, max_cola):
+    fact_inventario.reiniciar_contadores()
+    fact_inventario.cache_tipo_mov = fact_inventario.CacheLRU(fact_inventario.CAPACIDAD_CACHE_TIPO_MOV)
+    fact_inventario.cache_periodo = fact_inventario.CacheLRU(fact_inventario.CAPACIDAD_CACHE_PERIODO)
+    models = ClienteOdooStreaming(f'{url}/xmlrpc/2/object')
+    uid = 2
+    cursor = CursorSimulado(latencia_sql)
+    conn = ConexionSimulada(cursor)
+
+    field_names = list(models.execute_kw(DB, uid, PASSWORD, 'stock.move.line', 'fields_get', []))
+    ids = models.execute_kw(DB, uid, PASSWORD, 'stock.move.line', 'search', [[]])
+    indice_costos = construir_indice_costos(
+        models, DB, uid, PASSWORD,
+        productos_en_ventana(models, DB, uid, PASSWORD, []),
+        '2100-01-01 00:00:00'
+    )
+    lotes = fact_inventario.generar_lotes(ids, field_names, indice_costos,
+                                          models, DB, uid, PASSWORD)
+
+    inicio = time.perf_counter()
+    # Los print por línea de cargar_lote distorsionan la medición
+    with contextlib.redirect_stdout(io.StringIO()):
+        if modo == 'pipeline':
+            ejecutar_pipeline(lotes, lambda lote: fact_inventario.cargar_lote(lote, cursor, conn),
+                              max_cola=max_cola)
+        else:
+            for _, lote in lotes:
+                fact_inventario.cargar_lote(lote, cursor, conn)
+    return time.perf_counter() - inicio, len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lineas', type=int, default=1000)
+    parser.add_argument('--tamano-lote', type=int, default=100)
+    parser.add_argument('--latencia-odoo', type=float, default=0.002)
+    parser.add_argument('--latencia-sql', type=float, default=0.001)
+    parser.add_argument('--max-cola', type=int, default=2)
+    args = parser.parse_args()
+
+    fact_inventario.TAMANO_LOTE = args.tamano_lote
+
+    with OdooStub(generar_lineas(args.lineas), latencia=args.latencia_odoo) as odoo:
+        serial, lineas = ejecutar('serial', odoo.url, args.latencia_sql, args.max_cola)
+        pipeline, _ = ejecutar('pipeline', odoo.url, args.latencia_sql, args.max_cola)
+
+    print(f"Líneas: {lineas}  lote: {args.tamano_lote}  "
+          f"latencia Odoo: {args.latencia_odoo * 1000:.1f} ms  SQL: {args.latencia_sql * 1000:.1f} ms")
+    print(f"Serial:   {serial:7.2f} s  ({lineas / serial:8.1f} líneas/seg)")
+    print(f"Pipeline: {pipeline:7.2f} s  ({lineas / pipeline:8.1f} líneas/seg)")
+    print(f"Ganancia: {serial / pipeline:.2f}x")
+    estadisticas = fact_inventario.estadisticas_partners
+    print(f"Lecturas de res.partner: {estadisticas['lecturas']}  "
+          f"(líneas por lectura: {estadisticas['lineas'] / max(estadisticas['lecturas'], 1):.2f})")
+
+
+if __name__ == '__main__':
+    main()
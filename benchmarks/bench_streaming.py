@@ -0,0 +1,97 @@
+"""
+Compara xmlrpc.client.ServerProxy contra ClienteOdooStreaming al leer una
+respuesta grande de search_read desde un servidor local (proceso aparte).
+
+Mide el tiempo hasta el primer registro, el tiempo total y el pico de memoria
+del lado del cliente (tracemalloc, en una pasada separada de la de tiempos).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_streaming [--registros 100000]
+"""
+import argparse
+import multiprocessing
+import time
+import tracemalloc
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.odoo_stub import generar_lineas
+from odoo_streaming import ClienteOdooStreaming
+
+
+def _servir(registros, cola):
+    # Respuesta XML-RPC fija, generada una vez en el proceso del servidor
+    respuesta = xmlrpc.client.dumps((generar_lineas(registros),), methodresponse=True,
+                                    allow_none=True).encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/xml')
+            self.send_header('Content-Length', str(len(respuesta)))
+            self.end_headers()
+            for i in range(0, len(respuesta), 256 * 1024):
+                self.wfile.write(respuesta[i:i + 256 * 1024])
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    cola.put((servidor.server_address[1], len(respuesta)))
+    servidor.serve_forever()
+
+
+def _recorrer(leer):
+    # Consumidor mínimo: toca cada registro sin guardarlo
+    inicio = time.perf_counter()
+    primero = None
+    cantidad = 0
+    for registro in leer():
+        if primero is None:
+            primero = time.perf_counter() - inicio
+        cantidad += registro['id'] > 0
+    return primero, time.perf_counter() - inicio, cantidad
+
+
+def medir(leer):
+    primero, total, cantidad = _recorrer(leer)
+
+    tracemalloc.start()
+    _recorrer(leer)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return primero, total, pico, cantidad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--registros', type=int, default=100000)
+    args = parser.parse_args()
+
+    cola = multiprocessing.Queue()
+    servidor = multiprocessing.Process(target=_servir, args=(args.registros, cola), daemon=True)
+    servidor.start()
+    puerto, tamano = cola.get()
+    url = f'http://127.0.0.1:{puerto}/xmlrpc/2/object'
+    llamada = ('bench', 2, 'bench', 'stock.move.line', 'search_read', [[]])
+
+    proxy = xmlrpc.client.ServerProxy(url, allow_none=True)
+    cliente = ClienteOdooStreaming(url)
+    resultados = {
+        'ServerProxy': medir(lambda: proxy.execute_kw(*llamada)),
+        'Streaming':   medir(lambda: cliente.iter_execute_kw(*llamada)),
+    }
+    servidor.terminate()
+
+    print(f"Registros: {args.registros}  respuesta: {tamano / 2**20:.1f} MiB")
+    print(f"{'Cliente':<12} {'1er registro':>13} {'total':>9} {'pico memoria':>14}")
+    for nombre, (primero, total, pico, cantidad) in resultados.items():
+        assert cantidad == args.registros
+        print(f"{nombre:<12} {primero:12.3f}s {total:8.2f}s {pico / 2**20:12.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Servicios locales simulados para los benchmarks:
+
+- OdooStub: servidor XML-RPC que responde los execute_kw usados por
+  fact_inventario.py con datos sintéticos y una latencia fija por llamada.
+- CursorSimulado / ConexionSimulada: reemplazo de pyodbc con latencia por
+  sentencia. No guarda datos: toda línea se trata como nueva.
+"""
+import threading
+import time
+from socketserver import ThreadingMixIn
+from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+
+
+class _Handler(SimpleXMLRPCRequestHandler):
+    rpc_paths = ('/xmlrpc/2/common', '/xmlrpc/2/object')
+
+    def log_message(self, *args):
+        pass
+
+
+class _ServidorThreading(ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+
+def generar_lineas(cantidad, lineas_por_picking=5, productos=50, partners=20):
+    # Líneas sintéticas de stock.move.line
+    lineas = []
+    for i in range(1, cantidad + 1):
+        picking = (i - 1) // lineas_por_picking + 1
+        lineas.append({
+            'id': i,
+            'picking_id': [picking, f'WH/OUT/{picking:05d}'],
+            'reference': f'WH/OUT/{picking:05d}',
+            'company_id': [1, 'FT Foods'],
+            'product_id': [i % productos + 1, f'Producto {i % productos + 1}'],
+            'move_id': [i, f'Movimiento {i}'],
+            'quantity': float(i % 7 + 1),
+            'date': f'2025-10-{i % 28 + 1:02d} {i % 24:02d}:00:00',
+            'location_id': [8, 'WH/Stock'],
+            'location_dest_id': [5, 'Partners/Customers'],
+            'picking_partner_id': [picking % partners + 1, f'Cliente {picking % partners + 1}'],
+        })
+    return lineas
+
+
+class OdooStub:
+    """
+    Servidor XML-RPC local. `latencia` son los segundos que se suman a cada
+    execute_kw para simular la red hacia Odoo.
+    """
+    def __init__(self, lineas, latencia=0.0):
+        self.lineas = {linea['id']: linea for linea in lineas}
+        self.latencia = latencia
+        self.llamadas = 0
+        self._servidor = _ServidorThreading(('127.0.0.1', 0), requestHandler=_Handler,
+                                            allow_none=True, logRequests=False)
+        self._servidor.register_function(self.authenticate, 'authenticate')
+        self._servidor.register_function(self.execute_kw, 'execute_kw')
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address
+        return f'http://{host}:{puerto}'
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def authenticate(self, db, username, password, contexto):
+        return 2
+
+    def execute_kw(self, db, uid, password, modelo, metodo, args, kwargs=None):
+        self.llamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        manejador = getattr(self, '_' + modelo.replace('.', '_') + '__' + metodo)
+        return manejador(*args, **(kwargs or {}))
+
+    # --- stock.move.line
+    def _stock_move_line__fields_get(self, attributes=None):
+        return {campo: {'string': campo, 'type': 'char'}
+                for campo in next(iter(self.lineas.values()))}
+
+    def _stock_move_line__search(self, domain, **kwargs):
+        return sorted(self.lineas)
+
+    def _stock_move_line__read(self, ids, fields=None):
+        return [self.lineas[i] for i in ids if i in self.lineas]
+
+    def _stock_move_line__read_group(self, domain, fields, groupby, lazy=True):
+        productos = sorted({tuple(linea['product_id']) for linea in self.lineas.values()})
+        return [{'product_id': list(prod), '__count': 1} for prod in productos]
+
+    # --- product.product
+    def _product_product__read(self, ids, fields=None):
+        return [{'id': i, 'name': f'Producto {i}', 'categ_id': [1, 'Carnes'],
+                 'default_code': f'P{i:04d}', 'uom_id': [1, 'kg'],
+                 'standard_price': 1000.0 + i} for i in ids]
+
+    # --- res.partner
+    def _res_partner__read(self, ids, fields=None):
+        return [{'id': i, 'name': f'Cliente {i}', 'phone': '', 'email': '',
+                 'vat': '', 'street': 'Calle 1', 'street2': False, 'city': 'Santiago'}
+                for i in ids]
+
+    # --- stock.valuation.layer
+    def _stock_valuation_layer__search(self, domain, **kwargs):
+        # Capa de valoración solo para los movimientos pares
+        move_id = domain[0][2]
+        return [move_id] if move_id % 2 == 0 else []
+
+    def _stock_valuation_layer__search_read(self, domain, fields=None, order=None):
+        # Dos capas por producto: entrada inicial y una revalorización
+        capas = []
+        for prod_id in domain[0][2]:
+            capas.append({'id': prod_id * 10, 'product_id': [prod_id, ''], 'company_id': [1, ''],
+                          'create_date': '2025-01-01 00:00:00', 'unit_cost': 900.0,
+                          'value': 90000.0, 'quantity': 100.0})
+            capas.append({'id': prod_id * 10 + 1, 'product_id': [prod_id, ''], 'company_id': [1, ''],
+                          'create_date': '2025-10-15 00:00:00', 'unit_cost': 0.0,
+                          'value': 10000.0, 'quantity': 0.0})
+        return capas
+
+    def _stock_valuation_layer__read(self, ids, fields=None):
+        return [{'id': i, 'value': -1500.0 * (i % 7 + 1), 'quantity': -float(i % 7 + 1)}
+                for i in ids]
+
+    # --- stock.move
+    def _stock_move__read(self, ids, fields=None):
+        return [{'id': i, 'price_unit': 1200.0} for i in ids]
+
+
+class CursorSimulado:
+    """
+    Cursor con la interfaz de pyodbc usada por fact_inventario.py.
+    Cada sentencia espera `latencia` segundos (simula el ida y vuelta a SQL Server).
+    """
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.sentencias = 0
+        self._filas = []
+
+    def execute(self, sql, params=()):
+        self.sentencias += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        # Solo MAX(ID) devuelve fila: el resto de las búsquedas no encuentra nada
+        self._filas = [(0,)] if 'MAX(ID)' in sql else []
+        return self
+
+    def executemany(self, sql, filas):
+        self.execute(sql)
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+    def fetchall(self):
+        return list(self._filas)
+
+    def close(self):
+        pass
+
+
+class ConexionSimulada:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
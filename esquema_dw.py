@@ -0,0 +1,299 @@
+"""
+Esquema del Data Warehouse de inventario (BI_INVENTARIO_FT_FOODS).
+
+Declara las tablas que usan los scripts, sus claves y los índices que cubren
+cada búsqueda por clave natural del proceso de carga. Permite:
+
+- generar el DDL idempotente (se puede revisar sin conexión),
+- aplicarlo sobre una base existente o vacía,
+- verificar en una base existente qué columnas e índices faltan y qué
+  búsquedas quedan sin índice que las soporte.
+
+Aplicar el DDL es un paso explícito (--aplicar) con un usuario que tenga
+permisos de DDL; fact_inventario.py solo verifica, con permisos de lectura.
+
+Uso:
+    python esquema_dw.py --ddl          # imprime el DDL
+    python esquema_dw.py --aplicar      # aplica el DDL (serverINV.txt)
+    python esquema_dw.py --verificar    # informa columnas e índices faltantes (serverINV.txt)
+"""
+import argparse
+
+# Tabla -> columnas (nombre, tipo, acepta NULL). La primera columna es la clave primaria.
+TABLAS = {
+    'DIM_PERIODO': [
+        ('ID',   'INT', False),
+        ('ANIO', 'INT', False),
+        ('MES',  'INT', False),
+        ('DIA',  'INT', False),
+        ('HORA', 'INT', False),
+    ],
+    'DIM_TIPO_MOV': [
+        ('ID',         'INT',           False),
+        ('REFERENCIA', 'NVARCHAR(50)',  True),
+        ('ORIGEN',     'NVARCHAR(50)',  True),
+        ('DESTINO',    'NVARCHAR(50)',  True),
+        ('CLAVE_HASH', 'BINARY(32)',    True),
+    ],
+    'DIM_PRODUCTO': [
+        ('ID',         'INT',           False),
+        ('PRODUCTO',   'NVARCHAR(100)', True),
+        ('UNIDAD',     'NVARCHAR(50)',  True),
+        ('CATEGORIA',  'NVARCHAR(50)',  True),
+        ('REFERENCIA', 'NVARCHAR(50)',  True),
+        ('COSTO',      'FLOAT',         True),
+    ],
+    'DIM_CLI_PROV': [
+        ('ID',        'INT',          False),
+        ('NOMBRE',    'NVARCHAR(50)', True),
+        ('TELEFONO',  'NVARCHAR(50)', True),
+        ('CORREO',    'NVARCHAR(50)', True),
+        ('RUT',       'NVARCHAR(50)', True),
+        ('DIRECCION', 'NVARCHAR(50)', True),
+    ],
+    'DIM_ESTABLECIMIENTO': [
+        ('ID',       'INT',          False),
+        ('SUCURSAL', 'NVARCHAR(50)', True),
+    ],
+    'FACT_INVENTARIO': [
+        ('ID',                 'INT',   False),
+        ('ID_TIPO_MOV',        'INT',   True),
+        ('ID_ESTABLECIMIENTO', 'INT',   True),
+        ('ID_PRODUCTO',        'INT',   True),
+        ('ID_CLI_PROV',        'INT',   True),
+        ('ID_PERIODO',         'INT',   True),
+        ('CANTIDAD',           'FLOAT', True),
+        ('PRECIO_COMP',        'FLOAT', True),
+        ('PRECIO_TOT',         'FLOAT', True),
+        ('COSTO_REAL_UNIT',    'FLOAT', True),
+        ('COSTO_REAL_TOT',     'FLOAT', True),
+    ],
+}
+
+# Índices no agrupados: nombre -> (tabla, columnas clave, columnas incluidas)
+INDICES = {
+    'IX_DIM_PERIODO_FECHA':       ('DIM_PERIODO',  ['ANIO', 'MES', 'DIA', 'HORA'], ['ID']),
+    'IX_DIM_TIPO_MOV_CLAVE_HASH': ('DIM_TIPO_MOV', ['CLAVE_HASH'],                 ['ID']),
+}
+
+# Búsquedas del proceso de carga: (tabla, columnas del WHERE, columnas del SELECT).
+# DIM_TIPO_MOV se busca por CLAVE_HASH, que reemplaza a (REFERENCIA, ORIGEN, DESTINO).
+BUSQUEDAS = [
+    ('DIM_PERIODO',         ['ANIO', 'MES', 'DIA', 'HORA'], ['ID']),
+    ('DIM_TIPO_MOV',        ['CLAVE_HASH'],                 ['ID']),
+    ('DIM_PRODUCTO',        ['ID'],                         []),
+    ('DIM_CLI_PROV',        ['ID'],                         []),
+    ('DIM_ESTABLECIMIENTO', ['ID'],                         []),
+    ('FACT_INVENTARIO',     ['ID'],                         []),
+]
+
+
+def _ddl_tabla(tabla, columnas):
+    definiciones = ',\n'.join(
+        f"        {nombre} {tipo} {'NULL' if nulo else 'NOT NULL'}"
+        for nombre, tipo, nulo in columnas
+    )
+    return (
+        f"IF OBJECT_ID(N'dbo.{tabla}', N'U') IS NULL\n"
+        f"    CREATE TABLE dbo.{tabla} (\n"
+        f"{definiciones},\n"
+        f"        CONSTRAINT PK_{tabla} PRIMARY KEY CLUSTERED ({columnas[0][0]})\n"
+        f"    )"
+    )
+
+
+def _ddl_columna(tabla, nombre, tipo, nulo):
+    # Para tablas creadas antes de que existiera la columna
+    return (
+        f"IF COL_LENGTH(N'dbo.{tabla}', N'{nombre}') IS NULL\n"
+        f"    ALTER TABLE dbo.{tabla} ADD {nombre} {tipo} {'NULL' if nulo else 'NOT NULL'}"
+    )
+
+
+def _ddl_indice(nombre, tabla, claves, incluidas):
+    ddl = (
+        f"IF NOT EXISTS (SELECT 1 FROM sys.indexes\n"
+        f"                WHERE name = N'{nombre}' AND object_id = OBJECT_ID(N'dbo.{tabla}'))\n"
+        f"    CREATE NONCLUSTERED INDEX {nombre}\n"
+        f"        ON dbo.{tabla} ({', '.join(claves)})"
+    )
+    if incluidas:
+        ddl += f" INCLUDE ({', '.join(incluidas)})"
+    return ddl
+
+
+# Completa CLAVE_HASH de filas anteriores a la columna (mismo hash que hash_tipo_mov)
+DDL_COMPLETAR_CLAVE_HASH = (
+    "IF EXISTS (SELECT 1 FROM dbo.DIM_TIPO_MOV WHERE CLAVE_HASH IS NULL)\n"
+    "    UPDATE dbo.DIM_TIPO_MOV\n"
+    "       SET CLAVE_HASH = HASHBYTES('SHA2_256',\n"
+    "               CONCAT(REFERENCIA, NCHAR(31), ORIGEN, NCHAR(31), DESTINO))\n"
+    "     WHERE CLAVE_HASH IS NULL"
+)
+
+
+def generar_ddl():
+    """
+    Devuelve la lista de sentencias DDL, en orden de ejecución. Todas son
+    idempotentes: se pueden aplicar sobre una base vacía o ya creada.
+    """
+    sentencias = [_ddl_tabla(tabla, columnas) for tabla, columnas in TABLAS.items()]
+
+    # Columnas agregadas después de la creación original de la tabla
+    sentencias.append(_ddl_columna('DIM_TIPO_MOV', 'CLAVE_HASH', 'BINARY(32)', True))
+    sentencias.append(DDL_COMPLETAR_CLAVE_HASH)
+
+    sentencias += [_ddl_indice(nombre, tabla, claves, incluidas)
+                   for nombre, (tabla, claves, incluidas) in INDICES.items()]
+    return sentencias
+
+
+def aplicar_ddl(cursor, conn):
+    # Cada sentencia va en su propio lote (ALTER + UPDATE no pueden compilarse juntos)
+    for sentencia in generar_ddl():
+        cursor.execute(sentencia)
+        conn.commit()
+
+
+def indice_soporta(claves, incluidas, agrupado, columnas_where, columnas_select):
+    """
+    True si un índice resuelve la búsqueda sin recorrer la tabla: las columnas
+    del WHERE (igualdades) son las primeras claves del índice, en cualquier
+    orden, y las del SELECT están en el índice (o el índice es el agrupado).
+    """
+    prefijo = set(claves[:len(columnas_where)])
+    if prefijo != set(columnas_where):
+        return False
+    if agrupado:
+        return True
+    disponibles = set(claves) | set(incluidas)
+    return set(columnas_select) <= disponibles
+
+
+def leer_indices(cursor):
+    """
+    Índices existentes de las tablas declaradas:
+    tabla -> lista de (nombre, claves, incluidas, agrupado).
+    """
+    tablas = ', '.join(f"N'{tabla}'" for tabla in TABLAS)
+    cursor.execute(f"""
+        SELECT t.name, i.name, i.type_desc, c.name, ic.is_included_column, ic.key_ordinal
+          FROM sys.indexes i
+          JOIN sys.tables t         ON t.object_id = i.object_id
+          JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+          JOIN sys.columns c        ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+         WHERE t.name IN ({tablas})
+         ORDER BY t.name, i.name, ic.key_ordinal, ic.index_column_id
+    """)
+
+    indices = {}
+    for tabla, indice, tipo, columna, incluida, _ in cursor.fetchall():
+        entrada = indices.setdefault((tabla, indice), ([], [], tipo == 'CLUSTERED'))
+        (entrada[1] if incluida else entrada[0]).append(columna)
+
+    resultado = {}
+    for (tabla, indice), (claves, incluidas, agrupado) in indices.items():
+        resultado.setdefault(tabla, []).append((indice, claves, incluidas, agrupado))
+    return resultado
+
+
+def leer_columnas(cursor):
+    # Columnas existentes de las tablas declaradas: conjunto de (tabla, columna)
+    tablas = ', '.join(f"N'{tabla}'" for tabla in TABLAS)
+    cursor.execute(f"""
+        SELECT t.name, c.name
+          FROM sys.columns c
+          JOIN sys.tables t ON t.object_id = c.object_id
+         WHERE t.name IN ({tablas})
+    """)
+    return {(tabla, columna) for tabla, columna in cursor.fetchall()}
+
+
+def verificar_columnas(columnas_existentes):
+    # Columnas declaradas en TABLAS que no existen (incluye las de tablas faltantes)
+    return [(tabla, nombre) for tabla, columnas in TABLAS.items()
+            for nombre, _, _ in columnas if (tabla, nombre) not in columnas_existentes]
+
+
+def verificar_indices(indices_existentes):
+    """
+    Compara los índices existentes (ver leer_indices) contra el esquema.
+
+    Devuelve (indices_faltantes, busquedas_sin_indice):
+    - indices_faltantes:    nombres de INDICES que no existen
+    - busquedas_sin_indice: entradas de BUSQUEDAS que ningún índice soporta
+    """
+    existentes = {nombre for lista in indices_existentes.values() for nombre, *_ in lista}
+    faltantes = [nombre for nombre in INDICES if nombre not in existentes]
+
+    sin_indice = []
+    for tabla, columnas_where, columnas_select in BUSQUEDAS:
+        indices = indices_existentes.get(tabla, [])
+        # Los índices no agrupados contienen siempre la clave del agrupado
+        clave_agrupado = [c for _, claves, _, agrupado in indices if agrupado for c in claves]
+        soportada = any(
+            indice_soporta(claves, incluidas + clave_agrupado, agrupado,
+                           columnas_where, columnas_select)
+            for _, claves, incluidas, agrupado in indices
+        )
+        if not soportada:
+            sin_indice.append((tabla, columnas_where, columnas_select))
+    return faltantes, sin_indice
+
+
+def revisar_esquema(cursor):
+    """
+    Revisión de solo lectura (no requiere permisos de DDL).
+
+    Devuelve (columnas_faltantes, avisos): las columnas faltantes impiden la
+    carga; los avisos describen índices faltantes y búsquedas sin índice,
+    que solo la hacen más lenta.
+    """
+    columnas_faltantes = verificar_columnas(leer_columnas(cursor))
+    faltantes, sin_indice = verificar_indices(leer_indices(cursor))
+
+    avisos = []
+    for nombre in faltantes:
+        tabla, claves, incluidas = INDICES[nombre]
+        avisos.append(f"Falta índice {nombre} en {tabla} ({', '.join(claves)})")
+    for tabla, columnas_where, columnas_select in sin_indice:
+        avisos.append(f"Búsqueda sin índice: {tabla} WHERE {', '.join(columnas_where)}"
+                      + (f" -> {', '.join(columnas_select)}" if columnas_select else ''))
+    return columnas_faltantes, avisos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Esquema del DW de inventario')
+    accion = parser.add_mutually_exclusive_group(required=True)
+    accion.add_argument('--ddl', action='store_true', help='imprime el DDL idempotente')
+    accion.add_argument('--aplicar', action='store_true', help='aplica el DDL en SQL Server')
+    accion.add_argument('--verificar', action='store_true',
+                        help='informa columnas e índices faltantes')
+    args = parser.parse_args()
+
+    if args.ddl:
+        print('\nGO\n\n'.join(generar_ddl()) + '\nGO')
+        return
+
+    from fact_inventario import cargar_configuracion, conectar_sql
+    conn = conectar_sql(cargar_configuracion('serverINV.txt'))
+    cursor = conn.cursor()
+
+    if args.aplicar:
+        aplicar_ddl(cursor, conn)
+        print('Esquema aplicado.')
+    else:
+        columnas_faltantes, avisos = revisar_esquema(cursor)
+        for tabla, columna in columnas_faltantes:
+            print(f"Falta columna {tabla}.{columna}")
+        for aviso in avisos:
+            print(aviso)
+        if not columnas_faltantes and not avisos:
+            print('Esquema completo: todas las búsquedas tienen índice.')
+
+    cursor.close()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,26 @@
 import xmlrpc.client
-import pyodbc
+import argparse
 import time
+import hashlib
+import json
+import os
+import signal
+import threading
 import smtplib
 from email.mime.text import MIMEText
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from historial_ejecuciones import (
+    cargar_historial, registrar_ejecucion, construir_registro,
+    calcular_linea_base, evaluar_ejecucion, formatear_comparacion
+)
+from pipeline import ejecutar_pipeline, ErrorPipeline
+from indice_costos import (
+    IndiceCostos, construir_indice_costos, actualizar_indice_costos, productos_en_ventana,
+    restar_segundos, FORMATO_FECHA_ODOO
+)
+from esquema_dw import revisar_esquema
+from odoo_streaming import ClienteOdooStreaming
 
 new_period_ids      = []
 new_product_ids     = []
@@ -12,9 +29,97 @@ new_partner_ids     = []
 new_tipo_mov_ids    = []
 new_fact_ids        = []
 updated_fact_ids    = []
+CONTADORES          = (new_period_ids, new_product_ids, new_sucursal_ids, new_partner_ids,
+                       new_tipo_mov_ids, new_fact_ids, updated_fact_ids)
+
+# Lecturas de res.partner y líneas que las comparten (lotes confirmados)
+estadisticas_partners = {'lecturas': 0, 'lineas': 0}
 
 CHILE_TZ = timezone(timedelta(hours=-4))
 
+# Líneas de stock.move.line leídas y procesadas por lote
+TAMANO_LOTE = 500
+# Claves de DIM_TIPO_MOV recordadas en memoria entre lotes
+CAPACIDAD_CACHE_TIPO_MOV = 5000
+# Horas de DIM_PERIODO recordadas en memoria (más de un año)
+CAPACIDAD_CACHE_PERIODO = 10000
+# Parámetros por sentencia (SQL Server admite hasta 2100)
+MAX_PARAMETROS_SQL = 1000
+# Separador de campos al calcular CLAVE_HASH (NCHAR(31) en SQL Server)
+SEPARADOR_HASH = '\x1f'
+
+class CacheLRU:
+    """
+    Cache acotada en memoria: al superar la capacidad descarta la clave
+    usada hace más tiempo.
+
+    Las filas insertadas en la transacción en curso se guardan con
+    put_pendiente y solo pasan a la cache con confirmar() (después del
+    commit); descartar() las olvida si el lote se revierte.
+    """
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._datos = OrderedDict()
+        self._pendientes = {}
+
+    def get(self, clave):
+        if clave in self._pendientes:
+            return self._pendientes[clave]
+        if clave not in self._datos:
+            return None
+        self._datos.move_to_end(clave)
+        return self._datos[clave]
+
+    def put(self, clave, valor):
+        self._datos[clave] = valor
+        self._datos.move_to_end(clave)
+        if len(self._datos) > self.capacidad:
+            self._datos.popitem(last=False)
+
+    def put_pendiente(self, clave, valor):
+        self._pendientes[clave] = valor
+
+    def confirmar(self):
+        for clave, valor in self._pendientes.items():
+            self.put(clave, valor)
+        self._pendientes.clear()
+
+    def descartar(self):
+        self._pendientes.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+cache_tipo_mov = CacheLRU(CAPACIDAD_CACHE_TIPO_MOV)
+cache_periodo = CacheLRU(CAPACIDAD_CACHE_PERIODO)
+
+# Modo daemon: marca de agua y líneas ya cargadas, persistidas entre reinicios
+RUTA_ESTADO_DAEMON = 'daemon_estado.json'
+# Intentos de una línea aislada (micro-lote de 1) con error de datos antes de omitirla
+MAX_FALLOS_LINEA = 2
+# Omisiones seguidas sin ningún micro-lote exitoso a partir de las cuales el error
+# se considera general (no de una línea) y se deja de omitir
+MAX_OMITIDAS_SEGUIDAS = 5
+# Líneas omitidas que se conservan en el estado del daemon (las más recientes)
+MAX_OMITIDAS_GUARDADAS = 100
+
+def contadores_actuales() -> dict:
+    # Inserciones acumuladas desde el último reinicio de contadores
+    return {
+        'periodos':          len(new_period_ids),
+        'productos':         len(new_product_ids),
+        'sucursales':        len(new_sucursal_ids),
+        'cli_prov':          len(new_partner_ids),
+        'tipo_mov':          len(new_tipo_mov_ids),
+        'fact_insertados':   len(new_fact_ids),
+        'fact_actualizados': len(updated_fact_ids),
+    }
+
+def reiniciar_contadores():
+    for lista in CONTADORES:
+        lista.clear()
+    estadisticas_partners.update(lecturas=0, lineas=0)
+
 def send_email(config, subject, body):
     # Prepara el mensaje
     msg = MIMEText(body)
@@ -63,7 +168,13 @@ def get_period_dim_id(date_str, cursor, conn):
 
     year, month, day, hour = dt_chile.year, dt_chile.month, dt_chile.day, dt_chile.hour
 
-    # 4) Comprobamos si ya existe
+    # 4) Cache en memoria (se mantiene entre lotes)
+    clave = (year, month, day, hour)
+    periodo_id = cache_periodo.get(clave)
+    if periodo_id is not None:
+        return periodo_id
+
+    # 5) Comprobamos si ya existe
     cursor.execute("""
         SELECT ID
           FROM DIM_PERIODO
@@ -71,9 +182,11 @@ def get_period_dim_id(date_str, cursor, conn):
     """, (year, month, day, hour))
     row = cursor.fetchone()
     if row:
+        # Puede ser una fila insertada en este mismo lote, aún sin confirmar
+        cache_periodo.put_pendiente(clave, row[0])
         return row[0]
 
-    # 5) No existe → generamos nuevo ID e insertamos
+    # 6) No existe → generamos nuevo ID e insertamos
     cursor.execute("SELECT ISNULL(MAX(ID), 0) + 1 FROM DIM_PERIODO")
     new_id = cursor.fetchone()[0]
 
@@ -81,30 +194,24 @@ def get_period_dim_id(date_str, cursor, conn):
         INSERT INTO DIM_PERIODO (ID, ANIO, MES, DIA, HORA)
         VALUES (?, ?, ?, ?, ?)
     """, (new_id, year, month, day, hour))
-    conn.commit()
 
     new_period_ids.append(new_id)  # contador de periodos nuevos
+    cache_periodo.put_pendiente(clave, new_id)
     return new_id
 
-def sync_dim_producto(
+def leer_producto(
         prod_id: int,
         models,
         db: str,
         uid: int,
-        password: str,
-        cursor,
-        conn
-) -> int:
+        password: str
+) -> dict:
     """
-    1) Lee desde Odoo los campos name, category, default_code y uom_name.
-    2) Trunca cada valor al tamaño de la columna.
-    3) Inserta o actualiza en DIM_PRODUCTO usando prod_id como clave.
-    Devuelve siempre prod_id.
+    Lee desde Odoo los campos name, category, default_code, uom_name y
+    standard_price del producto (etapa de extracción).
 
     - models/db/uid/password: tu conexión XML-RPC a Odoo
-    - cursor/conn: tu conexión pyodbc a SQL Server
     """
-    # 1) Leer desde Odoo
     prod = models.execute_kw(
         db, uid, password,
         'product.product', 'read',
@@ -113,9 +220,24 @@ def sync_dim_producto(
     )
     if not prod:
         raise ValueError(f"Producto {prod_id} no existe en Odoo")
-    prod = prod[0]
+    return prod[0]
+
+def sync_dim_producto(
+        prod: dict,
+        cursor,
+        conn
+) -> int:
+    """
+    1) Toma el producto leído por leer_producto.
+    2) Trunca cada valor al tamaño de la columna.
+    3) Inserta o actualiza en DIM_PRODUCTO usando el id de Odoo como clave.
+    Devuelve siempre el id del producto.
+
+    - cursor/conn: tu conexión pyodbc a SQL Server
+    """
+    prod_id = prod['id']
 
-    # Extraer valores
+    # 1) Extraer valores
     name = prod.get('name') or ''
     default_code = prod.get('default_code') or ''
     # categ_id y uom_id vienen como tuplas (id, nombre)
@@ -167,7 +289,6 @@ def sync_dim_producto(
                        ))
         new_product_ids.append(prod_id)
 
-    conn.commit()
     return prod_id
 
 def sync_dim_sucursal(
@@ -211,24 +332,20 @@ def sync_dim_sucursal(
         """, (comp_id, sucursal))
         new_sucursal_ids.append(comp_id)
 
-    # 5) Commit
-    conn.commit()
     return comp_id
 
-def sync_dim_cliente_proveedor(
+def leer_cliente_proveedor(
     partner_tuple: tuple,
     models,
     db: str,
     uid: int,
-    password: str,
-    cursor,
-    conn
-) -> int | None:
+    password: str
+) -> dict | None:
     """
-    Inserta o actualiza un partner en DIM_CLIENTES según
-    item['picking_partner_id'] = (partner_id, partner_name).
+    Lee desde Odoo el partner de
+    item['picking_partner_id'] = (partner_id, partner_name) (etapa de extracción).
 
-    Devuelve el partner_id o None si partner_tuple es vacío.
+    Devuelve el dict leído o None si partner_tuple es vacío o no existe.
     """
     # 1) Desempaquetar
     if not partner_tuple:
@@ -244,7 +361,22 @@ def sync_dim_cliente_proveedor(
     )
     if not partner:
         return None
-    p = partner[0]
+    return partner[0]
+
+def sync_dim_cliente_proveedor(
+    p: dict | None,
+    cursor,
+    conn
+) -> int | None:
+    """
+    Inserta o actualiza en DIM_CLI_PROV el partner leído por
+    leer_cliente_proveedor.
+
+    Devuelve el partner_id o None si no hay partner.
+    """
+    if not p:
+        return None
+    partner_id = p['id']
 
     # 3) Construir valores y truncar a NVARCHAR(50)
     nombre    = (p.get('name')    or '')[:50]
@@ -294,172 +426,123 @@ def sync_dim_cliente_proveedor(
         ))
         new_partner_ids.append(partner_id)
 
-    conn.commit()
     return partner_id
 
-def sync_dim_tipo_mov(
-    item: dict,
-    cursor,
-    conn
-) -> int:
+def clave_tipo_mov(item: dict) -> tuple:
     """
-    Upsert en DIM_TIPO_MOV basándose en (reference, origen, destino).
-
-    - item: el dict leído de stock.move.line, con claves
-        'reference', 'location_id', 'location_dest_id'
-      donde 'location_id' y 'location_dest_id' son tuplas (id, name).
-    - cursor: pyodbc.Cursor
-    - conn:   pyodbc.Connection
-
-    Devuelve el ID existente o recién creado.
+    Clave natural de DIM_TIPO_MOV: (reference, origen, destino), donde
+    origen/destino son los nombres de 'location_id' y 'location_dest_id'.
+    Los valores se truncan a NVARCHAR(50) igual que en la tabla.
     """
-    # 1) Extraer valores y usar el nombre de la ubicación
-    reference       = item.get('reference') or ''
-    origen          = item.get('location_id')[1]      if item.get('location_id')      else ''
-    destino         = item.get('location_dest_id')[1] if item.get('location_dest_id') else ''
-
-    # 2) Truncar a NVARCHAR(50)
-    reference = reference[:50]
-    origen    = origen[:50]
-    destino   = destino[:50]
-
-    # 3) Comprobar existencia
-    cursor.execute("""
-        SELECT ID
-          FROM DIM_TIPO_MOV
-         WHERE REFERENCIA = ?
-           AND ORIGEN     = ?
-           AND DESTINO    = ?
-    """, (reference, origen, destino))
-    row = cursor.fetchone()
-    if row:
-        return row[0]
-
-    # 4) Nuevo ID manual (MAX+1 porque no es IDENTITY)
-    cursor.execute("SELECT ISNULL(MAX(ID), 0) + 1 FROM DIM_TIPO_MOV")
-    new_id = cursor.fetchone()[0]
-
-    # 5) Insertar
-    cursor.execute("""
-        INSERT INTO DIM_TIPO_MOV (ID, REFERENCIA, ORIGEN, DESTINO)
-        VALUES (?, ?, ?, ?)
-    """, (new_id, reference, origen, destino))
+    reference = item.get('reference') or ''
+    origen    = item.get('location_id')[1]      if item.get('location_id')      else ''
+    destino   = item.get('location_dest_id')[1] if item.get('location_dest_id') else ''
+    return reference[:50], origen[:50], destino[:50]
 
-    conn.commit()
-    new_tipo_mov_ids.append(new_id)
-    return new_id
-
-
-
-def cargar_configuracion(ruta):
-    config = {}
-    with open(ruta, 'r') as archivo:
-        for linea in archivo:
-            if '=' in linea:
-                clave, valor = linea.strip().split('=', 1)
-                config[clave.strip()] = valor.strip()
-    return config
-
-# Parámetros conexión Odoo
-odoo_config = cargar_configuracion('odoo.txt')
-url = odoo_config['url']
-db = odoo_config['db']
-username = odoo_config['username']
-password = odoo_config['password']
-
-# Parámetros conexión SQL Server
-sql_config = cargar_configuracion('serverINV.txt')
-server = sql_config['server']
-database = sql_config['database']
-username_sql = sql_config['username_sql']
-password_sql = sql_config['password_sql']
-
-# Conexión Odoo
-common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common')
-uid = common.authenticate(db, username, password, {})
-models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
-
-# Conexión SQL Server
-conn = pyodbc.connect(
-    f'DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username_sql};PWD={password_sql}')
-cursor = conn.cursor()
-
-all_fields = models.execute_kw(db, uid, password,
-    'stock.move.line', 'fields_get', [], {'attributes': ['string', 'type']})
-field_names = list(all_fields.keys())
-fields = ['id','picking_id','company_id','product_id','quantity','date'
-          ,'location_id','location_dest_id', 'picking_partner_id','reference']
-
-with open('fechas.txt', 'r') as f:
-    fechas = {}
-    for line in f:
-        if '=' in line:
-            key, value = line.strip().split('=', 1)
-            fechas[key.strip()] = value.strip()
-
-
-inicio = fechas['Inicio']
-fin   = fechas['Fin']
-
-domain = [
-    ['date', '>=', inicio],
-    ['date', '<',  fin],
-]
-
-# Inicio tiempo ejecución
-start_time = time.time()
-
-ids = models.execute_kw(db, uid, password,
-    'stock.move.line', 'search',
-    [ domain ],
-)
-
-# 4. Leer todos los campos
-data = models.execute_kw(db, uid, password,
-    'stock.move.line', 'read', [ids, field_names,])
-
-for item in data:
-    # Identificadores
-    id = item['id']
-
-    # Periodo
-    date_str = item['date']
-    date_dim_id = get_period_dim_id(date_str, cursor, conn)
-
-    # Producto
-    prod_id = item['product_id'][0]
-    # esto lee de Odoo y upserta en tu dimensión
-    dim_prod_id = sync_dim_producto(
-        prod_id,
-        models, db, uid, password,
-        cursor, conn
-    )
+def hash_tipo_mov(clave: tuple) -> bytes:
+    """
+    SHA-256 de la clave natural, igual al que calcula SQL Server con
+    HASHBYTES('SHA2_256', CONCAT(REFERENCIA, NCHAR(31), ORIGEN, NCHAR(31), DESTINO))
+    (NVARCHAR se hashea como UTF-16LE).
+    """
+    texto = SEPARADOR_HASH.join(clave)
+    return hashlib.sha256(texto.encode('utf-16-le')).digest()
 
-    # Clientes/ proveedores
-    dim_partner_id = sync_dim_cliente_proveedor(
-        item.get('picking_partner_id'),
-        models, db, uid, password,
-        cursor, conn
-    )
+def sync_dim_tipo_mov_lote(
+    claves: list,
+    cursor,
+    conn,
+    cache: CacheLRU
+) -> list:
+    """
+    Upsert en DIM_TIPO_MOV para todas las líneas de un lote.
 
-    # Establecimiento
-    company_tuple = item['company_id']
-    dim_sucursal_id = sync_dim_sucursal(
-        company_tuple,
-        cursor,
-        conn
-    )
+    - claves: clave natural de cada línea (ver clave_tipo_mov)
+    - cursor/conn: conexión pyodbc a SQL Server
+    - cache: CacheLRU clave natural -> ID, se mantiene entre lotes
 
-    if dim_sucursal_id == 1:
-        dim_sucursal_id = 2
+    1) Resuelve desde la cache las claves vistas recientemente.
+    2) Busca el resto en un solo SELECT por CLAVE_HASH.
+    3) Inserta las claves nuevas con un solo MAX(ID) y un executemany
+       (sin commit: lo confirma cargar_lote junto con el resto del lote).
 
-    # Tipo de movimiento
-    dim_tipo_mov_id = sync_dim_tipo_mov(item, cursor, conn)
+    Devuelve la lista de IDs en el mismo orden que claves.
+    """
+    resultado = {}
+    pendientes = {}   # hash -> clave
+
+    # 1) Cache en memoria
+    for clave in claves:
+        if clave in resultado:
+            continue
+        dim_id = cache.get(clave)
+        if dim_id is not None:
+            resultado[clave] = dim_id
+        else:
+            pendientes[hash_tipo_mov(clave)] = clave
+
+    # 2) Búsqueda por hash (bloques bajo el límite de 2100 parámetros)
+    hashes = list(pendientes)
+    for i in range(0, len(hashes), MAX_PARAMETROS_SQL):
+        bloque = hashes[i:i + MAX_PARAMETROS_SQL]
+        marcadores = ', '.join('?' * len(bloque))
+        cursor.execute(f"""
+            SELECT CLAVE_HASH, MIN(ID)
+              FROM DIM_TIPO_MOV
+             WHERE CLAVE_HASH IN ({marcadores})
+             GROUP BY CLAVE_HASH
+        """, bloque)
+        for clave_hash, dim_id in cursor.fetchall():
+            clave = pendientes.pop(bytes(clave_hash))
+            resultado[clave] = dim_id
+            cache.put(clave, dim_id)
+
+    # 3) Insertar las claves nuevas (MAX+1 porque no es IDENTITY)
+    if pendientes:
+        cursor.execute("SELECT ISNULL(MAX(ID), 0) FROM DIM_TIPO_MOV")
+        ultimo_id = cursor.fetchone()[0]
+
+        filas = []
+        nuevos = []   # (clave, ID)
+        for clave_hash, clave in pendientes.items():
+            ultimo_id += 1
+            filas.append((ultimo_id, *clave, clave_hash))
+            nuevos.append((clave, ultimo_id))
+
+        cursor.executemany("""
+            INSERT INTO DIM_TIPO_MOV (ID, REFERENCIA, ORIGEN, DESTINO, CLAVE_HASH)
+            VALUES (?, ?, ?, ?, ?)
+        """, filas)
+
+        # Después del INSERT y como pendientes: solo pasan a la cache cuando
+        # cargar_lote confirma el lote, así un lote revertido no deja en la
+        # cache IDs que no existen en la tabla
+        for clave, dim_id in nuevos:
+            resultado[clave] = dim_id
+            cache.put_pendiente(clave, dim_id)
+            new_tipo_mov_ids.append(dim_id)
+
+    return [resultado[clave] for clave in claves]
+
+
+
+def calcular_costo_real(
+    item: dict,
+    indice_costos,
+    models,
+    db: str,
+    uid: int,
+    password: str
+) -> tuple:
+    """
+    Costo real de la línea desde stock.valuation.layer (por movimiento y
+    compañía/establecimiento), con fallback al costo histórico del producto a
+    la fecha de la línea (indice_costos, ver indice_costos.py).
 
+    Devuelve (costo_real_unit, costo_real_tot).
+    """
     move_id = item['move_id'][0]
-
-    # === COSTO REAL DESDE SVL (por movimiento y compañía/establecimiento) ===
-    comp_id = company_tuple[0]  # company_id real de Odoo para filtrar SVL
+    comp_id = item['company_id'][0]  # company_id real de Odoo para filtrar SVL
 
     svl_ids = models.execute_kw(db, uid, password,
                                 'stock.valuation.layer', 'search',
@@ -468,6 +551,7 @@ for item in data:
 
     costo_real_unit = None
     costo_real_tot = None
+    sum_val = sum_qty = 0.0
 
     if svl_ids:
         svls = models.execute_kw(db, uid, password,
@@ -483,15 +567,9 @@ for item in data:
 
     # === FALLBACK si SVL no devuelve nada o qty=0 ===
     if costo_real_unit is None:
-        # 1) intenta costo promedio del producto (a falta de historial por fecha)
-        #    Si no te sirve, puedes leer product.standard_price
-        prod = models.execute_kw(db, uid, password,
-                                 'product.product', 'read',
-                                 [[item['product_id'][0]]],
-                                 {'fields': ['standard_price']}
-                                 )
-        std = prod[0].get('standard_price') or 0.0
-        costo_real_unit = float(std)
+        # Costo promedio del producto vigente a la fecha de la línea (en memoria)
+        costo = indice_costos.costo_a_fecha(item['product_id'][0], comp_id, item['date'])
+        costo_real_unit = float(costo or 0.0)
 
     # --- total por línea ---
     qty_line = float(item['quantity'] or 0.0)
@@ -504,128 +582,719 @@ for item in data:
         # Fallback: unitario * cantidad de la línea
         costo_real_tot = (1 if qty_line >= 0 else -1) * abs(costo_real_unit) * abs(qty_line)
 
-    # Ahora lees el coste unitario registrado en ese movimiento
-    move = models.execute_kw(db, uid, password,
-        'stock.move', 'read',
-        [[move_id]],
-        {'fields': ['price_unit']}
+    return costo_real_unit, costo_real_tot
+
+def extraer_lote(
+    ids_lote: list,
+    field_names: list,
+    indice_costos,
+    models,
+    db: str,
+    uid: int,
+    password: str
+) -> list:
+    """
+    Etapa de extracción: lee un lote de stock.move.line y todo lo que la carga
+    necesita desde Odoo (producto, partner, costo real y precio del movimiento).
+    No toca SQL Server.
+
+    Cada partner (picking_partner_id) se lee una vez por lote y se comparte
+    entre sus líneas. La clave de tipo de movimiento sale de los campos de
+    cada línea (sin llamadas a Odoo); su búsqueda en SQL ya se agrupa por
+    lote en sync_dim_tipo_mov_lote.
+
+    Devuelve una lista de dicts con la línea y sus datos enriquecidos.
+    """
+    data = models.execute_kw(db, uid, password,
+        'stock.move.line', 'read', [ids_lote, field_names,])
+
+    # Un solo read por partner distinto del lote
+    partners = {}   # partner_id -> dict leído (o None)
+    for item in data:
+        partner_tuple = item.get('picking_partner_id')
+        partner_id = partner_tuple[0] if partner_tuple else None
+        if partner_id not in partners:
+            partners[partner_id] = leer_cliente_proveedor(
+                partner_tuple, models, db, uid, password
+            )
+
+    lote = []
+    for item in data:
+        partner_tuple = item.get('picking_partner_id')
+        partner = partners[partner_tuple[0] if partner_tuple else None]
+        producto = leer_producto(item['product_id'][0], models, db, uid, password)
+        costo_real_unit, costo_real_tot = calcular_costo_real(
+            item, indice_costos, models, db, uid, password
+        )
+
+        # Ahora lees el coste unitario registrado en ese movimiento
+        move = models.execute_kw(db, uid, password,
+            'stock.move', 'read',
+            [[item['move_id'][0]]],
+            {'fields': ['price_unit']}
+        )
+
+        lote.append({
+            'linea':           item,
+            'producto':        producto,
+            'partner':         partner,
+            'clave_tipo_mov':  clave_tipo_mov(item),
+            'costo_real_unit': costo_real_unit,
+            'costo_real_tot':  costo_real_tot,
+            'precio_unitario': move[0]['price_unit'],
+        })
+    return lote
+
+def cargar_lote(lote: list, cursor, conn):
+    """
+    Etapa de carga: actualiza las dimensiones y FACT_INVENTARIO para un lote
+    ya extraído. Solo usa SQL Server.
+
+    El lote es atómico: las funciones sync_* no confirman, y el lote se
+    confirma con un solo commit al final. Si algo falla, las altas en
+    memoria (contadores y caches) se deshacen y el error se propaga; el
+    llamador revierte la transacción con conn.rollback().
+    """
+    marcas = [len(lista) for lista in CONTADORES]
+    try:
+        _cargar_lote(lote, cursor, conn)
+        conn.commit()
+    except Exception:
+        for lista, largo in zip(CONTADORES, marcas):
+            del lista[largo:]
+        cache_tipo_mov.descartar()
+        cache_periodo.descartar()
+        raise
+    cache_tipo_mov.confirmar()
+    cache_periodo.confirmar()
+
+    # Solo lotes confirmados: un lote reintentado no se cuenta dos veces
+    estadisticas_partners['lineas'] += len(lote)
+    estadisticas_partners['lecturas'] += len({registro['linea']['picking_partner_id'][0]
+                                              for registro in lote
+                                              if registro['linea'].get('picking_partner_id')})
+
+def _cargar_lote(lote: list, cursor, conn):
+    # Tipo de movimiento: se resuelve para todo el lote de una vez
+    tipo_mov_ids = sync_dim_tipo_mov_lote(
+        [registro['clave_tipo_mov'] for registro in lote], cursor, conn, cache_tipo_mov
     )
 
-    # Parametros Fact_inventario
-    cantidad = item['quantity']
-    precio_unitario = move[0]['price_unit']
-    precio_total = precio_unitario * cantidad
-
-    fact_id = item['id']
-    tipo_mov_id = dim_tipo_mov_id
-    establecimiento = dim_sucursal_id
-    producto_id = dim_prod_id
-    cli_prov_id = dim_partner_id
-    periodo_id = date_dim_id
-    cantidad = cantidad
-    precio_comp = precio_unitario
-    precio_tot = precio_total
-
-    cursor.execute("SELECT 1 FROM FACT_INVENTARIO WHERE ID = ?", (fact_id,))
-    if cursor.fetchone():
-        # 2a) Si existe, lo actualizamos
-        cursor.execute("""
-                       UPDATE FACT_INVENTARIO
-                       SET ID_TIPO_MOV        = ?,
-                           ID_ESTABLECIMIENTO = ?,
-                           ID_PRODUCTO        = ?,
-                           ID_CLI_PROV        = ?,
-                           ID_PERIODO         = ?,
-                           CANTIDAD           = ?,
-                           PRECIO_COMP        = ?,
-                           PRECIO_TOT         = ?,
-                           COSTO_REAL_UNIT    = ?,
-                           COSTO_REAL_TOT     = ?
-                       WHERE ID = ?
-                       """, (
-                           tipo_mov_id,
-                           establecimiento,
-                           producto_id,
-                           cli_prov_id,
-                           periodo_id,
-                           cantidad,
-                           precio_comp,
-                           precio_tot,
-                           costo_real_unit,
-                           costo_real_tot,
-                           fact_id
-                       ))
-        updated_fact_ids.append(fact_id)
-        print(f"ID {fact_id} actualizado")
+    # Partners ya sincronizados en este lote (se comparten entre líneas)
+    partners_sincronizados = {}
+
+    for registro, dim_tipo_mov_id in zip(lote, tipo_mov_ids):
+        item = registro['linea']
+
+        # Periodo
+        date_dim_id = get_period_dim_id(item['date'], cursor, conn)
+
+        # Producto
+        dim_prod_id = sync_dim_producto(registro['producto'], cursor, conn)
+
+        # Clientes/ proveedores (una vez por partner y lote)
+        partner = registro['partner']
+        partner_id = partner['id'] if partner else None
+        if partner_id not in partners_sincronizados:
+            partners_sincronizados[partner_id] = sync_dim_cliente_proveedor(partner, cursor, conn)
+        dim_partner_id = partners_sincronizados[partner_id]
+
+        # Establecimiento
+        dim_sucursal_id = sync_dim_sucursal(item['company_id'], cursor, conn)
+
+        if dim_sucursal_id == 1:
+            dim_sucursal_id = 2
+
+        # Parametros Fact_inventario
+        cantidad = item['quantity']
+        precio_unitario = registro['precio_unitario']
+        precio_total = precio_unitario * cantidad
+
+        fact_id = item['id']
+        tipo_mov_id = dim_tipo_mov_id
+        establecimiento = dim_sucursal_id
+        producto_id = dim_prod_id
+        cli_prov_id = dim_partner_id
+        periodo_id = date_dim_id
+        precio_comp = precio_unitario
+        precio_tot = precio_total
+        costo_real_unit = registro['costo_real_unit']
+        costo_real_tot = registro['costo_real_tot']
+
+        cursor.execute("SELECT 1 FROM FACT_INVENTARIO WHERE ID = ?", (fact_id,))
+        if cursor.fetchone():
+            # 2a) Si existe, lo actualizamos
+            cursor.execute("""
+                           UPDATE FACT_INVENTARIO
+                           SET ID_TIPO_MOV        = ?,
+                               ID_ESTABLECIMIENTO = ?,
+                               ID_PRODUCTO        = ?,
+                               ID_CLI_PROV        = ?,
+                               ID_PERIODO         = ?,
+                               CANTIDAD           = ?,
+                               PRECIO_COMP        = ?,
+                               PRECIO_TOT         = ?,
+                               COSTO_REAL_UNIT    = ?,
+                               COSTO_REAL_TOT     = ?
+                           WHERE ID = ?
+                           """, (
+                               tipo_mov_id,
+                               establecimiento,
+                               producto_id,
+                               cli_prov_id,
+                               periodo_id,
+                               cantidad,
+                               precio_comp,
+                               precio_tot,
+                               costo_real_unit,
+                               costo_real_tot,
+                               fact_id
+                           ))
+            updated_fact_ids.append(fact_id)
+            print(f"ID {fact_id} actualizado")
+        else:
+            # 2b) Si no existe, lo insertamos
+            cursor.execute("""
+                           INSERT INTO FACT_INVENTARIO (ID,
+                                                        ID_TIPO_MOV,
+                                                        ID_ESTABLECIMIENTO,
+                                                        ID_PRODUCTO,
+                                                        ID_CLI_PROV,
+                                                        ID_PERIODO,
+                                                        CANTIDAD,
+                                                        PRECIO_COMP,
+                                                        PRECIO_TOT,
+                                                        COSTO_REAL_UNIT,
+                                                        COSTO_REAL_TOT)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                           """, (
+                               fact_id,
+                               tipo_mov_id,
+                               establecimiento,
+                               producto_id,
+                               cli_prov_id,
+                               periodo_id,
+                               cantidad,
+                               precio_comp,
+                               precio_tot,
+                               costo_real_unit,
+                               costo_real_tot
+                           ))
+            new_fact_ids.append(fact_id)
+            print(f"ID {fact_id} insertado")
+
+def cargar_configuracion(ruta):
+    config = {}
+    with open(ruta, 'r') as archivo:
+        for linea in archivo:
+            if '=' in linea:
+                clave, valor = linea.strip().split('=', 1)
+                config[clave.strip()] = valor.strip()
+    return config
+
+def conectar_sql(sql_config):
+    # pyodbc solo se necesita al conectar; las etapas reciben cursor/conn
+    import pyodbc
+    return pyodbc.connect(
+        f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={sql_config['server']};"
+        f"DATABASE={sql_config['database']};UID={sql_config['username_sql']};"
+        f"PWD={sql_config['password_sql']}")
+
+def verificar_esquema_dw(cursor):
+    """
+    Revisa el esquema antes de cargar, solo con lecturas: el DDL se aplica
+    aparte con `python esquema_dw.py --aplicar`. Si faltan columnas (p.ej.
+    CLAVE_HASH) la carga no puede seguir; los índices faltantes solo se avisan.
+    """
+    columnas_faltantes, avisos = revisar_esquema(cursor)
+    for aviso in avisos:
+        print(f"Advertencia de esquema: {aviso}")
+    if columnas_faltantes:
+        faltantes = ', '.join(f"{tabla}.{columna}" for tabla, columna in columnas_faltantes)
+        raise RuntimeError(f"Faltan columnas en el Data Warehouse ({faltantes}); "
+                           "ejecute 'python esquema_dw.py --aplicar'")
+
+def generar_lotes(ids, field_names, indice_costos, models, db, uid, password):
+    # Produce (numero_lote, lote) extraídos, de TAMANO_LOTE líneas cada uno
+    for numero_lote, inicio_lote in enumerate(range(0, len(ids), TAMANO_LOTE), start=1):
+        ids_lote = ids[inicio_lote:inicio_lote + TAMANO_LOTE]
+        yield numero_lote, extraer_lote(ids_lote, field_names, indice_costos,
+                                        models, db, uid, password)
+
+def cargar_marca(ruta, desde=None) -> tuple:
+    """
+    Estado del modo daemon: (marca, vistos, omitidas).
+
+    - marca:    mayor write_date de stock.move.line ya cargado
+    - vistos:   id -> write_date de las líneas cargadas dentro del margen de
+                la marca (ver buscar_cambios)
+    - omitidas: líneas que no se pudieron cargar (id, write_date, error)
+
+    Sin estado guardado parte desde `desde` o desde ahora (UTC). Lanza
+    ValueError si la marca no tiene el formato de Odoo.
+    """
+    if os.path.exists(ruta):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+        marca = estado['write_date']
+        vistos = {int(linea_id): fecha for linea_id, fecha in estado.get('vistos', {}).items()}
+        omitidas = estado.get('omitidas', [])
     else:
-        # 2b) Si no existe, lo insertamos
-        cursor.execute("""
-                       INSERT INTO FACT_INVENTARIO (ID,
-                                                    ID_TIPO_MOV,
-                                                    ID_ESTABLECIMIENTO,
-                                                    ID_PRODUCTO,
-                                                    ID_CLI_PROV,
-                                                    ID_PERIODO,
-                                                    CANTIDAD,
-                                                    PRECIO_COMP,
-                                                    PRECIO_TOT,
-                                                    COSTO_REAL_UNIT,
-                                                    COSTO_REAL_TOT)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                       """, (
-                           fact_id,
-                           tipo_mov_id,
-                           establecimiento,
-                           producto_id,
-                           cli_prov_id,
-                           periodo_id,
-                           cantidad,
-                           precio_comp,
-                           precio_tot,
-                           costo_real_unit,
-                           costo_real_tot
-                       ))
-        new_fact_ids.append(fact_id)
-        print(f"ID {fact_id} insertado")
-
-# Al final del script, después de conn.commit()
-conn.commit()
-
-end_time = time.time()
-total_time = round(end_time - start_time, 2)
-
-summary = (
-    "Resumen de ejecución de fact_inventario.py\n\n"
-    f"Fecha de cargas  Desde:{inicio}  Hasta:{fin}\n"
-    f"- Periodos insertados:      {len(new_period_ids)}\n"
-    f"- Productos insertados:     {len(new_product_ids)}\n"
-    f"- Sucursales insertadas:    {len(new_sucursal_ids)}\n"
-    f"- Cli/Prov insertados:      {len(new_partner_ids)}\n"
-    f"- TipoMov insertados:       {len(new_tipo_mov_ids)}\n\n"
-    "Resumen FACT_INVENTARIO\n"
-    f"- Insertados:               {len(new_fact_ids)}\n"
-    f"- Actualizados:             {len(updated_fact_ids)}\n\n"
-    f"Tiempo total de ejecución:  {total_time:.2f} segundos\n"
-)
+        marca = desde or datetime.now(timezone.utc).strftime(FORMATO_FECHA_ODOO)
+        vistos, omitidas = {}, []
+
+    # Se valida una sola vez al iniciar, no dentro del ciclo de reintentos
+    datetime.strptime(marca, FORMATO_FECHA_ODOO)
+    return marca, vistos, omitidas
+
+def guardar_marca(ruta, marca, vistos, omitidas):
+    # Escritura atómica: un corte a mitad no deja el archivo corrupto
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'write_date': marca, 'vistos': vistos,
+                   'omitidas': omitidas[-MAX_OMITIDAS_GUARDADAS:]}, f)
+    os.replace(temporal, ruta)
+
+def buscar_cambios(marca, vistos, limite, margen, models, db, uid, password) -> list:
+    """
+    Líneas nuevas o modificadas para el siguiente micro-lote: hasta `limite`
+    dicts {id, write_date, product_id}, en orden (write_date, id).
+
+    Se consulta desde `margen` segundos antes de la marca y no desde la marca
+    misma: write_date es la hora de inicio de la transacción, así que una
+    transacción larga puede confirmar líneas con fecha anterior a la marca.
+    Se descartan las líneas de `vistos` que no cambiaron; como a lo más se
+    descartan len(vistos), pedir limite + len(vistos) asegura avanzar aunque
+    muchas líneas compartan el mismo write_date.
+    """
+    lineas = models.execute_kw(db, uid, password,
+        'stock.move.line', 'search_read',
+        [[['write_date', '>=', restar_segundos(marca, margen)]]],
+        {'fields': ['write_date', 'product_id'],
+         'order': 'write_date asc, id asc',
+         'limit': limite + len(vistos)}
+    )
+    nuevas = [linea for linea in lineas if vistos.get(linea['id']) != linea['write_date']]
+    return nuevas[:limite]
 
-# Cargamos configuración de email y enviamos
-email_cfg = cargar_email_config('email_config.txt')
-send_email(
-    email_cfg,
-    subject="Resumen de ejecución de fact_inventario",
-    body=summary
-)
+def avanzar_marca(marca, vistos, lineas, margen) -> str:
+    """
+    Registra como cargadas las líneas del micro-lote y devuelve la nueva
+    marca. `vistos` se actualiza en el lugar y conserva solo lo que aún cae
+    dentro del margen.
+    """
+    for linea in lineas:
+        vistos[linea['id']] = linea['write_date']
+    marca = max([marca] + [linea['write_date'] for linea in lineas])
+
+    limite_margen = restar_segundos(marca, margen)
+    for linea_id in [i for i, fecha in vistos.items() if fecha < limite_margen]:
+        del vistos[linea_id]
+    return marca
+
+def procesar_micro_lote(lineas, field_names, indice_costos, margen,
+                        models, db, uid, password, cursor, conn):
+    """
+    Extrae y carga un micro-lote del modo daemon con las conexiones, caches e
+    índice de costos ya abiertos. El índice solo recibe las capas nuevas y
+    el historial de los productos que aún no tenía.
+    """
+    actualizar_indice_costos(
+        indice_costos, models, db, uid, password,
+        sorted({linea['product_id'][0] for linea in lineas if linea.get('product_id')}),
+        datetime.now(timezone.utc).strftime(FORMATO_FECHA_ODOO),
+        margen
+    )
+    lote = extraer_lote([linea['id'] for linea in lineas], field_names, indice_costos,
+                        models, db, uid, password)
+    cargar_lote(lote, cursor, conn)
+
+def recuperar_sql(conn, cursor, sql_config) -> tuple:
+    """
+    Tras un error deja la conexión SQL utilizable: revierte el micro-lote en
+    curso y, si la conexión se perdió, reconecta con un cursor nuevo. Si no
+    es posible, devuelve los mismos y se reintenta en el siguiente ciclo.
+
+    Devuelve (conn, cursor).
+    """
+    try:
+        conn.rollback()
+        return conn, cursor
+    except Exception:
+        pass
+    for recurso in (cursor, conn):
+        try:
+            recurso.close()
+        except Exception:
+            pass
+    try:
+        conn = conectar_sql(sql_config)
+        return conn, conn.cursor()
+    except Exception as e:
+        print(f"No fue posible reconectar a SQL Server: {e!r}")
+        return conn, cursor
+
+def es_error_de_datos(error) -> bool:
+    """
+    True si el error se debe a los datos de alguna línea y no a la red o a
+    la base (reintentar el mismo micro-lote no lo resuelve): campos con tipo
+    inesperado, registros inexistentes, Fault de Odoo o errores de datos de
+    pyodbc.
+    """
+    if isinstance(error, (ValueError, TypeError, KeyError, IndexError, xmlrpc.client.Fault)):
+        return True
+    # pyodbc se importa solo al conectar: se compara por nombre
+    return type(error).__name__ in ('DataError', 'IntegrityError')
+
+def enviar_heartbeat(email_cfg, periodo, marca, limite, final=False):
+    """
+    Resumen periódico del modo daemon (reemplaza al correo por ejecución).
+    Registra el periodo en el historial y reinicia los contadores.
+    """
+    ahora = datetime.now()
+    contadores = contadores_actuales()
+    registro = construir_registro(
+        periodo['inicio'].isoformat(timespec='seconds'),
+        ahora.isoformat(timespec='seconds'),
+        dict(contadores, micro_lotes=periodo['micro_lotes'], errores=periodo['errores'],
+             omitidas=len(periodo['omitidas']), latencia_max=round(periodo['latencia_max'], 2)),
+        lineas=periodo['lineas'],
+        segundos=periodo['segundos'],
+        modo='daemon',
+    )
+    linea_base = calcular_linea_base(cargar_historial(), 'daemon')
+    # El volumen de un periodo depende de la hora del día: solo se vigila el rendimiento
+    alertas = evaluar_ejecucion(registro, linea_base, evaluar_volumen=False)
+    registrar_ejecucion(registro)
+
+    resumen = (
+        f"{'Cierre' if final else 'Heartbeat'} de fact_inventario.py (modo daemon)\n\n"
+        f"Periodo  Desde:{registro['inicio']}  Hasta:{registro['fin']}\n"
+        f"- Micro-lotes:              {periodo['micro_lotes']}\n"
+        f"- Líneas procesadas:        {periodo['lineas']}\n"
+        f"- Latencia máxima:          {periodo['latencia_max']:.2f} segundos\n"
+        f"- Líneas por micro-lote:    {limite} (límite actual)\n"
+        f"- Errores:                  {periodo['errores']}\n"
+        + (f"- Último error:             {periodo['ultimo_error']}\n" if periodo['ultimo_error'] else '')
+        + (f"- Líneas omitidas:          {', '.join(map(str, periodo['omitidas']))}\n"
+           if periodo['omitidas'] else '')
+        + f"- Marca de agua:            {marca}\n\n"
+        f"- Periodos insertados:      {contadores['periodos']}\n"
+        f"- Productos insertados:     {contadores['productos']}\n"
+        f"- Sucursales insertadas:    {contadores['sucursales']}\n"
+        f"- Cli/Prov insertados:      {contadores['cli_prov']}\n"
+        f"- TipoMov insertados:       {contadores['tipo_mov']}\n"
+        f"- FACT insertados:          {contadores['fact_insertados']}\n"
+        f"- FACT actualizados:        {contadores['fact_actualizados']}\n\n"
+        + formatear_comparacion(registro, linea_base, alertas)
+    )
+    asunto = f"{'Cierre' if final else 'Heartbeat'} de fact_inventario (daemon)"
+    if alertas or periodo['errores'] or periodo['omitidas']:
+        asunto = "[ALERTA] " + asunto
+
+    print(f"\n{resumen}")
+    try:
+        send_email(email_cfg, subject=asunto, body=resumen)
+    except Exception as e:
+        # Un problema de SMTP no debe detener la carga
+        print(f"No fue posible enviar el heartbeat: {e!r}")
+    reiniciar_contadores()
+
+def nuevo_periodo_heartbeat() -> dict:
+    return {'inicio': datetime.now(), 'micro_lotes': 0, 'lineas': 0, 'segundos': 0.0,
+            'latencia_max': 0.0, 'errores': 0, 'ultimo_error': None, 'omitidas': []}
+
+def ejecutar_daemon(args, sql_config, field_names, models, db, uid, password, conn):
+    """
+    Modo daemon: mantiene abiertas las conexiones a Odoo y SQL Server, las
+    caches de dimensiones y el índice de costos, y cada `args.intervalo`
+    segundos carga como micro-lote las líneas nuevas o modificadas (por
+    write_date, con `args.margen` segundos de traslape).
+
+    - El tamaño del micro-lote se ajusta para mantener su duración bajo
+      `args.latencia_objetivo` (nunca más de `args.max_lote` líneas).
+    - Un error de datos achica el micro-lote a la mitad hasta aislar la línea
+      que falla; con un micro-lote de 1 la línea se omite tras
+      MAX_FALLOS_LINEA intentos (queda en el estado y en el heartbeat). Tras
+      MAX_OMITIDAS_SEGUIDAS omisiones sin un éxito el error se trata como
+      general y solo se reintenta.
+    - Tras cualquier error se revierte SQL y se cierra la conexión a Odoo.
+    - Cada `args.heartbeat` segundos envía un resumen por correo.
+    - SIGTERM/SIGINT terminan el micro-lote en curso, guardan la marca y
+      envían el resumen de cierre.
+    """
+    detener = threading.Event()
+
+    def al_recibir_senal(signum, frame):
+        print(f"\nSeñal {signum} recibida: se detiene al terminar el micro-lote en curso")
+        detener.set()
+
+    signal.signal(signal.SIGTERM, al_recibir_senal)
+    signal.signal(signal.SIGINT, al_recibir_senal)
+    if hasattr(signal, 'SIGBREAK'):
+        # Windows: Ctrl+Break o detención del servicio
+        signal.signal(signal.SIGBREAK, al_recibir_senal)
+
+    try:
+        marca, vistos, omitidas = cargar_marca(RUTA_ESTADO_DAEMON, args.desde)
+    except (ValueError, KeyError, TypeError) as e:
+        raise SystemExit(f"Marca de agua inválida en --desde o {RUTA_ESTADO_DAEMON} ({e}); "
+                         f"se espera 'YYYY-MM-DD HH:MM:SS' (UTC)")
+
+    email_cfg = cargar_email_config('email_config.txt')
+    cursor = conn.cursor()
+    indice_costos = IndiceCostos()
+    limite = args.max_lote
+    fallos_linea = {}   # id de la línea aislada -> intentos fallidos seguidos
+    omitidas_seguidas = 0
+    periodo = nuevo_periodo_heartbeat()
+    reiniciar_contadores()
+    print(f"Modo daemon iniciado desde {marca} "
+          f"(intervalo {args.intervalo} s, margen {args.margen} s, heartbeat {args.heartbeat} s)")
+
+    while not detener.is_set():
+        inicio = time.time()
+        lineas = []
+        esperar = True
+        try:
+            lineas = buscar_cambios(marca, vistos, limite, args.margen,
+                                    models, db, uid, password)
+            if lineas:
+                procesar_micro_lote(lineas, field_names, indice_costos, args.margen,
+                                    models, db, uid, password, cursor, conn)
+                marca = avanzar_marca(marca, vistos, lineas, args.margen)
+                guardar_marca(RUTA_ESTADO_DAEMON, marca, vistos, omitidas)
+                fallos_linea.clear()
+                omitidas_seguidas = 0
+
+                duracion = time.time() - inicio
+                periodo['micro_lotes'] += 1
+                periodo['lineas'] += len(lineas)
+                periodo['segundos'] += duracion
+                periodo['latencia_max'] = max(periodo['latencia_max'], duracion)
+                print(f"Micro-lote: {len(lineas)} líneas en {duracion:.2f} s (marca {marca})")
+
+                # Un micro-lote lleno indica cambios pendientes: se sigue sin esperar
+                esperar = len(lineas) < limite
+
+                # Ajustar el tamaño para mantener acotada la latencia
+                if duracion > args.latencia_objetivo and limite > 1:
+                    limite = max(1, limite // 2)
+                elif duracion < args.latencia_objetivo / 2 and limite < args.max_lote:
+                    limite = min(args.max_lote, limite * 2)
+        except Exception as e:
+            # La marca no avanza: el micro-lote se reintenta en el siguiente ciclo
+            periodo['errores'] += 1
+            periodo['ultimo_error'] = repr(e)
+            print(f"Error en micro-lote: {e!r}")
+            conn, cursor = recuperar_sql(conn, cursor, sql_config)
+            models.cerrar()
+
+            if lineas and es_error_de_datos(e) and omitidas_seguidas < MAX_OMITIDAS_SEGUIDAS:
+                # Alguna línea tiene datos que no se pueden cargar: se aísla
+                # achicando el micro-lote y se reintenta sin esperar
+                esperar = False
+                if limite > 1:
+                    limite = max(1, limite // 2)
+                else:
+                    linea = lineas[0]
+                    fallos_linea[linea['id']] = fallos_linea.get(linea['id'], 0) + 1
+                    if fallos_linea[linea['id']] >= MAX_FALLOS_LINEA:
+                        # Si la línea se corrige en Odoo cambia su write_date y se vuelve a cargar
+                        print(f"Línea {linea['id']} omitida: {e!r}")
+                        omitidas.append({'id': linea['id'], 'write_date': linea['write_date'],
+                                         'error': repr(e)})
+                        periodo['omitidas'].append(linea['id'])
+                        del fallos_linea[linea['id']]
+                        omitidas_seguidas += 1
+                        marca = avanzar_marca(marca, vistos, [linea], args.margen)
+                        guardar_marca(RUTA_ESTADO_DAEMON, marca, vistos, omitidas)
+
+        if time.time() - periodo['inicio'].timestamp() >= args.heartbeat:
+            enviar_heartbeat(email_cfg, periodo, marca, limite)
+            periodo = nuevo_periodo_heartbeat()
+
+        if esperar:
+            detener.wait(args.intervalo)
+
+    enviar_heartbeat(email_cfg, periodo, marca, limite, final=True)
+    cursor.close()
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga de FACT_INVENTARIO desde Odoo')
+    parser.add_argument('--modo', choices=['serial', 'pipeline', 'daemon'], default='serial',
+                        help='serial: extrae y carga por turnos; '
+                             'pipeline: extrae el lote siguiente mientras se carga el actual; '
+                             'daemon: proceso permanente que carga micro-lotes')
+    parser.add_argument('--max-cola', type=int, default=2,
+                        help='lotes extraídos en espera de carga (modo pipeline)')
+    parser.add_argument('--intervalo', type=float, default=60,
+                        help='segundos entre consultas de cambios (modo daemon)')
+    parser.add_argument('--max-lote', type=int, default=200,
+                        help='líneas máximas por micro-lote (modo daemon)')
+    parser.add_argument('--latencia-objetivo', type=float, default=60,
+                        help='duración máxima deseada de un micro-lote en segundos (modo daemon)')
+    parser.add_argument('--margen', type=float, default=600,
+                        help='segundos de traslape al buscar cambios, para las transacciones '
+                             'que confirman tarde (modo daemon)')
+    parser.add_argument('--heartbeat', type=float, default=3600,
+                        help='segundos entre correos de resumen (modo daemon)')
+    parser.add_argument('--desde', default=None,
+                        help="write_date inicial 'YYYY-MM-DD HH:MM:SS' (UTC) si no hay "
+                             f"{RUTA_ESTADO_DAEMON} (modo daemon; por defecto, ahora)")
+    args = parser.parse_args()
+
+    # Parámetros conexión Odoo
+    odoo_config = cargar_configuracion('odoo.txt')
+    url = odoo_config['url']
+    db = odoo_config['db']
+    username = odoo_config['username']
+    password = odoo_config['password']
+
+    # Parámetros conexión SQL Server
+    sql_config = cargar_configuracion('serverINV.txt')
+
+    # Conexión Odoo
+    common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common')
+    uid = common.authenticate(db, username, password, {})
+    models = ClienteOdooStreaming(f'{url}/xmlrpc/2/object')
+
+    # Conexión SQL Server
+    conn = conectar_sql(sql_config)
+    cursor = conn.cursor()
+    verificar_esquema_dw(cursor)
+
+    all_fields = models.execute_kw(db, uid, password,
+        'stock.move.line', 'fields_get', [], {'attributes': ['string', 'type']})
+    field_names = list(all_fields.keys())
+
+    if args.modo == 'daemon':
+        cursor.close()
+        ejecutar_daemon(args, sql_config, field_names, models, db, uid, password, conn)
+        return
+
+    fechas = cargar_configuracion('fechas.txt')
+    inicio = fechas['Inicio']
+    fin   = fechas['Fin']
+
+    domain = [
+        ['date', '>=', inicio],
+        ['date', '<',  fin],
+    ]
+
+    # Inicio tiempo ejecución
+    start_time = time.time()
+
+    ids = models.execute_kw(db, uid, password,
+        'stock.move.line', 'search',
+        [ domain ],
+    )
+
+    # Índice de costos históricos de los productos de la ventana (una vez por ejecución)
+    indice_costos = construir_indice_costos(
+        models, db, uid, password,
+        productos_en_ventana(models, db, uid, password, domain),
+        fin
+    )
+
+    lotes = generar_lotes(ids, field_names, indice_costos, models, db, uid, password)
+    if args.modo == 'pipeline':
+        # Odoo se lee en un hilo aparte; SQL Server se escribe en este
+        try:
+            ejecutar_pipeline(lotes, lambda lote: cargar_lote(lote, cursor, conn),
+                              max_cola=args.max_cola)
+        except ErrorPipeline as e:
+            conn.rollback()
+            print(f"\n{e}")
+            if e.ultimo_lote is not None:
+                ultimo_id = ids[min(e.ultimo_lote * TAMANO_LOTE, len(ids)) - 1]
+                print(f"Lotes completos confirmados: {e.ultimo_lote} "
+                      f"({e.ultimo_lote * TAMANO_LOTE} IDs, hasta el ID {ultimo_id})")
+            raise
+    else:
+        for _, lote in lotes:
+            cargar_lote(lote, cursor, conn)
+
+    conn.commit()
+
+    end_time = time.time()
+    total_time = round(end_time - start_time, 2)
+
+    # Factor de deduplicación medido: líneas por cada lectura de res.partner
+    lineas_por_lectura = (estadisticas_partners['lineas'] / estadisticas_partners['lecturas']
+                          if estadisticas_partners['lecturas'] else 0.0)
+
+    summary = (
+        "Resumen de ejecución de fact_inventario.py\n\n"
+        f"Fecha de cargas  Desde:{inicio}  Hasta:{fin}\n"
+        f"Modo de ejecución: {args.modo}\n"
+        f"- Periodos insertados:      {len(new_period_ids)}\n"
+        f"- Productos insertados:     {len(new_product_ids)}\n"
+        f"- Sucursales insertadas:    {len(new_sucursal_ids)}\n"
+        f"- Cli/Prov insertados:      {len(new_partner_ids)}\n"
+        f"- TipoMov insertados:       {len(new_tipo_mov_ids)}\n\n"
+        "Resumen FACT_INVENTARIO\n"
+        f"- Insertados:               {len(new_fact_ids)}\n"
+        f"- Actualizados:             {len(updated_fact_ids)}\n\n"
+        "Lecturas de partners\n"
+        f"- Lecturas de res.partner:  {estadisticas_partners['lecturas']}\n"
+        f"- Líneas por lectura:       {lineas_por_lectura:.2f}\n\n"
+        f"Tiempo total de ejecución:  {total_time:.2f} segundos\n"
+    )
+
+    # Historial de ejecuciones: comparamos contra la línea base antes de registrar
+    registro = construir_registro(
+        inicio, fin,
+        dict(contadores_actuales(),
+             lecturas_partner=estadisticas_partners['lecturas'],
+             lineas_por_lectura_partner=round(lineas_por_lectura, 2)),
+        lineas=len(ids),
+        segundos=end_time - start_time,
+        modo=args.modo,
+    )
+    linea_base = calcular_linea_base(cargar_historial(), args.modo)
+    alertas = evaluar_ejecucion(registro, linea_base)
+    registrar_ejecucion(registro)
+
+    summary += (
+        f"Líneas procesadas:          {registro['lineas']} "
+        f"({registro['lineas_por_segundo']:.2f} líneas/seg)\n\n"
+        + formatear_comparacion(registro, linea_base, alertas)
+    )
+
+    asunto = "Resumen de ejecución de fact_inventario"
+    if alertas:
+        asunto = "[ALERTA] " + asunto
+
+    # Cargamos configuración de email y enviamos
+    email_cfg = cargar_email_config('email_config.txt')
+    send_email(
+        email_cfg,
+        subject=asunto,
+        body=summary
+    )
+
+    print("\n===== RESUMEN DE INSERCIONES =====")
+    print(f"Periodos   Nuevos: {len(new_period_ids)}")
+    print(f"Productos  Nuevos: {len(new_product_ids)}")
+    print(f"Sucursales Nuevos: {len(new_sucursal_ids)}")
+    print(f"Cli/Prov   Nuevos: {len(new_partner_ids)}")
+    print(f"TipoMov    Nuevos: {len(new_tipo_mov_ids)}")
+
+    print("\n===== RESUMEN FACT_INVENTARIO =====")
+    print(f"  Insertados:   {len(new_fact_ids)}")
+    print(f"  Actualizados: {len(updated_fact_ids)}")
 
-print("\n===== RESUMEN DE INSERCIONES =====")
-print(f"Periodos   Nuevos: {len(new_period_ids)}")
-print(f"Productos  Nuevos: {len(new_product_ids)}")
-print(f"Sucursales Nuevos: {len(new_sucursal_ids)}")
-print(f"Cli/Prov   Nuevos: {len(new_partner_ids)}")
-print(f"TipoMov    Nuevos: {len(new_tipo_mov_ids)}")
+    print(f"\nLecturas de res.partner: {estadisticas_partners['lecturas']}  "
+          f"(líneas por lectura: {lineas_por_lectura:.2f})")
 
-print("\n===== RESUMEN FACT_INVENTARIO =====")
-print(f"  Insertados:   {len(new_fact_ids)}")
-print(f"  Actualizados: {len(updated_fact_ids)}")
+    print(f'Tiempo de ejecución: {total_time} segundos')
+    for alerta in alertas:
+        print(f'ALERTA: {alerta}')
 
-print(f'Tiempo de ejecución: {total_time} segundos')
+    cursor.close()
+    conn.close()
 
+if __name__ == '__main__':
+    main()
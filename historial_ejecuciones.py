@@ -0,0 +1,165 @@
+import json
+import os
+from datetime import datetime
+from statistics import median
+
+# Archivo local (una ejecución por línea, formato JSON)
+RUTA_HISTORIAL = 'historial_ejecuciones.jsonl'
+
+# Cantidad de ejecuciones anteriores que forman la línea base
+VENTANA_BASE = 10
+# Mínimo de ejecuciones previas para poder comparar
+MIN_EJECUCIONES_BASE = 3
+# Alertar si líneas/seg cae más de un 30% bajo la mediana
+UMBRAL_RENDIMIENTO = 0.70
+# Alertar si el volumen de líneas cae más de un 50% bajo la mediana
+UMBRAL_VOLUMEN = 0.50
+# Con muy pocas líneas el rendimiento no es representativo
+MIN_LINEAS_RENDIMIENTO = 50
+
+
+def horas_ventana(inicio, fin):
+    # Largo de la ventana en horas (None si las fechas no se pueden interpretar)
+    try:
+        horas = (datetime.fromisoformat(fin) - datetime.fromisoformat(inicio)).total_seconds() / 3600
+    except (TypeError, ValueError):
+        return None
+    return horas if horas > 0 else None
+
+
+def construir_registro(inicio, fin, contadores, lineas, segundos, modo='serial'):
+    """
+    Arma el registro de una ejecución.
+
+    - inicio/fin:  ventana procesada (valores de fechas.txt)
+    - modo:        modo de ejecución de fact_inventario.py
+    - contadores:  dict con las inserciones por dimensión y FACT_INVENTARIO
+    - lineas:      cantidad de stock.move.line procesadas
+    - segundos:    tiempo total de ejecución
+    """
+    horas = horas_ventana(inicio, fin)
+    registro = {
+        'fecha_ejecucion': datetime.now().isoformat(timespec='seconds'),
+        'modo': modo,
+        'inicio': inicio,
+        'fin': fin,
+        'lineas': lineas,
+        'horas_ventana': horas,
+        # Volumen normalizado: permite comparar ventanas de distinto largo
+        'lineas_por_dia': round(lineas * 24 / horas, 2) if horas else None,
+        'segundos': round(segundos, 2),
+        'lineas_por_segundo': round(lineas / segundos, 2) if segundos > 0 else 0.0,
+    }
+    registro.update(contadores)
+    return registro
+
+
+def cargar_historial(ruta=RUTA_HISTORIAL):
+    """
+    Devuelve la lista de ejecuciones registradas (más antigua primero).
+    Las líneas corruptas se ignoran para no bloquear la carga.
+    """
+    if not os.path.exists(ruta):
+        return []
+    historial = []
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                historial.append(json.loads(linea))
+            except ValueError:
+                continue
+    return historial
+
+
+def registrar_ejecucion(registro, ruta=RUTA_HISTORIAL):
+    # Append: una ejecución por línea
+    with open(ruta, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+def calcular_linea_base(historial, modo='serial', ventana=VENTANA_BASE):
+    """
+    Mediana de líneas por día de ventana y de líneas/seg de las últimas
+    `ventana` ejecuciones del mismo modo (los registros sin modo se
+    consideran 'serial'). Los registros anteriores a lineas_por_dia no
+    cuentan para el volumen.
+    Devuelve None si no hay suficientes ejecuciones previas.
+    """
+    del_modo = [r for r in historial if r.get('modo', 'serial') == modo]
+    recientes = del_modo[-ventana:]
+    if len(recientes) < MIN_EJECUCIONES_BASE:
+        return None
+
+    # Solo ejecuciones con volumen suficiente cuentan para el rendimiento
+    rendimientos = [r.get('lineas_por_segundo', 0.0) for r in recientes
+                    if r.get('lineas', 0) >= MIN_LINEAS_RENDIMIENTO]
+    volumenes = [r['lineas_por_dia'] for r in recientes if r.get('lineas_por_dia') is not None]
+
+    return {
+        'ejecuciones': len(recientes),
+        'lineas_por_dia': median(volumenes) if volumenes else None,
+        'lineas_por_segundo': median(rendimientos) if rendimientos else None,
+    }
+
+
+def evaluar_ejecucion(registro, base, evaluar_volumen=True):
+    """
+    Compara la ejecución contra la línea base.
+    Devuelve la lista de alertas (vacía si todo está dentro de lo normal).
+    """
+    alertas = []
+    if base is None:
+        return alertas
+
+    lineas = registro['lineas']
+    lps = registro['lineas_por_segundo']
+
+    # 1) Regresión de rendimiento
+    base_lps = base['lineas_por_segundo']
+    if base_lps and lineas >= MIN_LINEAS_RENDIMIENTO and lps < base_lps * UMBRAL_RENDIMIENTO:
+        caida = (1 - lps / base_lps) * 100
+        alertas.append(
+            f"Rendimiento bajo: {lps:.2f} líneas/seg, "
+            f"{caida:.0f}% bajo la mediana ({base_lps:.2f})"
+        )
+
+    # 2) Caída anormal de volumen, por día de ventana (un backfill de varios
+    #    días no debe hacer parecer bajas las ejecuciones diarias siguientes)
+    base_lpd = base['lineas_por_dia']
+    lpd = registro.get('lineas_por_dia')
+    if evaluar_volumen and base_lpd and lpd is not None and lpd < base_lpd * UMBRAL_VOLUMEN:
+        caida = (1 - lpd / base_lpd) * 100
+        alertas.append(
+            f"Volumen bajo: {lpd:.0f} líneas por día de ventana, "
+            f"{caida:.0f}% bajo la mediana ({base_lpd:.0f})"
+        )
+
+    return alertas
+
+
+def formatear_comparacion(registro, base, alertas):
+    # Texto que se agrega al resumen del correo
+    if base is None:
+        return ("Comparación con ejecuciones anteriores\n"
+                f"- Sin línea base (se requieren {MIN_EJECUCIONES_BASE} ejecuciones previas)\n")
+
+    base_lps = base['lineas_por_segundo']
+    mediana_lps = f"mediana {base_lps:.2f}" if base_lps else "sin mediana"
+    base_lpd = base['lineas_por_dia']
+    mediana_lpd = f"mediana {base_lpd:.0f}" if base_lpd else "sin mediana"
+    lpd = registro.get('lineas_por_dia')
+    texto = (
+        f"Comparación con ejecuciones anteriores (últimas {base['ejecuciones']})\n"
+        f"- Líneas procesadas:        {registro['lineas']}\n"
+        f"- Líneas por día (ventana): {f'{lpd:.0f}' if lpd is not None else '-'}  ({mediana_lpd})\n"
+        f"- Líneas por segundo:       {registro['lineas_por_segundo']:.2f}  ({mediana_lps})\n"
+    )
+
+    if alertas:
+        texto += "\n*** ALERTAS ***\n"
+        for alerta in alertas:
+            texto += f"- {alerta}\n"
+    return texto
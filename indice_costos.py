@@ -0,0 +1,181 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+# Productos por consulta a stock.valuation.layer / product.product
+PRODUCTOS_POR_CONSULTA = 200
+# Formato de fechas de Odoo por XML-RPC (UTC)
+FORMATO_FECHA_ODOO = '%Y-%m-%d %H:%M:%S'
+CAMPOS_CAPA = ['product_id', 'company_id', 'create_date', 'unit_cost', 'value', 'quantity']
+
+
+def restar_segundos(fecha, segundos):
+    # fecha en formato de Odoo menos `segundos`, en el mismo formato
+    return (datetime.strptime(fecha, FORMATO_FECHA_ODOO) - timedelta(seconds=segundos)) \
+        .strftime(FORMATO_FECHA_ODOO)
+
+
+class IndiceCostos:
+    """
+    Costo unitario histórico por (producto, compañía).
+
+    Para cada par guarda dos listas paralelas ordenadas por fecha: fechas
+    ('YYYY-MM-DD HH:MM:SS', formato de Odoo) y costo vigente desde esa fecha.
+    costo_a_fecha resuelve con bisect, sin llamadas a Odoo.
+
+    Para mantenerlo al día sin reconstruirlo (modo daemon, ver
+    actualizar_indice_costos) guarda también el valor y la cantidad
+    acumulados por par, los productos indexados y los IDs de las capas
+    recientes, para ignorar las que se vuelvan a leer.
+    """
+    def __init__(self):
+        self._fechas = {}
+        self._costos = {}
+        self._costo_actual = {}   # product_id -> standard_price actual
+        self._acumulado = {}      # (product_id, company_id) -> [valor, cantidad]
+        self._recientes = {}      # id de capa -> create_date
+        self.productos = set()
+        self.actualizado_hasta = None
+
+    def agregar(self, prod_id, comp_id, fecha, costo):
+        # Se espera que las fechas lleguen en orden ascendente
+        clave = (prod_id, comp_id)
+        self._fechas.setdefault(clave, []).append(fecha)
+        self._costos.setdefault(clave, []).append(costo)
+
+    def agregar_capa(self, capa):
+        """
+        Aplica una capa de stock.valuation.layer (en orden de create_date).
+        El costo es el promedio acumulado valor / cantidad del par; si la
+        cantidad acumulada no es positiva se usa el unit_cost de la capa.
+        """
+        if capa['id'] in self._recientes:
+            return
+        self._recientes[capa['id']] = capa['create_date']
+
+        clave = (capa['product_id'][0], capa['company_id'][0])
+        totales = self._acumulado.setdefault(clave, [0.0, 0.0])
+        totales[0] += capa.get('value') or 0.0
+        totales[1] += capa.get('quantity') or 0.0
+
+        if totales[1] > 0:
+            costo = abs(totales[0]) / totales[1]
+        else:
+            costo = abs(capa.get('unit_cost') or 0.0)
+
+        # Una capa confirmada tarde (fecha anterior a la última conocida)
+        # rige desde la última fecha, para no desordenar la lista
+        fechas = self._fechas.get(clave)
+        fecha = max(capa['create_date'], fechas[-1]) if fechas else capa['create_date']
+        self.agregar(clave[0], clave[1], fecha, costo)
+
+    def olvidar_capas(self, antes_de):
+        # Las capas anteriores a `antes_de` ya no se vuelven a leer
+        self._recientes = {i: f for i, f in self._recientes.items() if f >= antes_de}
+
+    def fijar_costo_actual(self, prod_id, costo):
+        self._costo_actual[prod_id] = costo
+
+    def costo_a_fecha(self, prod_id, comp_id, fecha):
+        """
+        Costo vigente del producto en la compañía a la fecha indicada.
+
+        1) Último costo registrado en o antes de `fecha`.
+        2) Si la fecha es anterior a todo el historial, el primer costo conocido.
+        3) Sin historial, el standard_price actual (o None si no se cargó).
+        """
+        fechas = self._fechas.get((prod_id, comp_id))
+        if fechas:
+            pos = bisect_right(fechas, fecha) - 1
+            return self._costos[(prod_id, comp_id)][max(pos, 0)]
+        return self._costo_actual.get(prod_id)
+
+    def __len__(self):
+        return len(self._fechas)
+
+
+def productos_en_ventana(models, db, uid, password, domain):
+    # IDs de productos con movimientos en la ventana (una sola llamada read_group)
+    grupos = models.execute_kw(db, uid, password,
+        'stock.move.line', 'read_group',
+        [domain, ['product_id'], ['product_id']],
+        {'lazy': False}
+    )
+    return [g['product_id'][0] for g in grupos if g.get('product_id')]
+
+
+def construir_indice_costos(models, db, uid, password, product_ids, hasta, indice=None):
+    """
+    Arma el índice de costos para los productos de la ventana, una vez por ejecución.
+
+    - product_ids: productos a indexar (ver productos_en_ventana)
+    - hasta:       fin de la ventana; se ignoran capas posteriores
+    - indice:      índice existente al que se agregan los productos (modo
+                   daemon); por defecto se crea uno nuevo
+
+    El costo a cada fecha es el promedio acumulado de stock.valuation.layer
+    (valor acumulado / cantidad acumulada) por producto y compañía, lo que
+    también recoge las revalorizaciones. Si la cantidad acumulada no es
+    positiva se usa el unit_cost de la capa. Los productos sin capas quedan
+    con su standard_price actual.
+    """
+    nuevo = indice is None
+    if nuevo:
+        indice = IndiceCostos()
+
+    for i in range(0, len(product_ids), PRODUCTOS_POR_CONSULTA):
+        bloque = product_ids[i:i + PRODUCTOS_POR_CONSULTA]
+
+        # 1) Capas de valoración en orden cronológico, decodificadas a medida que llegan
+        capas = models.iter_execute_kw(db, uid, password,
+            'stock.valuation.layer', 'search_read',
+            [[('product_id', 'in', bloque), ('create_date', '<', hasta)]],
+            {'fields': CAMPOS_CAPA, 'order': 'create_date asc, id asc'}
+        )
+        for capa in capas:
+            indice.agregar_capa(capa)
+
+        # 2) standard_price actual, solo como último recurso
+        productos = models.execute_kw(db, uid, password,
+            'product.product', 'read',
+            [bloque],
+            {'fields': ['standard_price']}
+        )
+        for prod in productos:
+            indice.fijar_costo_actual(prod['id'], float(prod.get('standard_price') or 0.0))
+        indice.productos.update(bloque)
+
+    if nuevo:
+        # Índice de una sola ventana: no se vuelve a leer ninguna capa
+        indice.olvidar_capas(hasta)
+    return indice
+
+
+def actualizar_indice_costos(indice, models, db, uid, password, product_ids, hasta, margen):
+    """
+    Mantiene al día hasta `hasta` un índice de larga duración (modo daemon),
+    sin reconstruirlo:
+
+    1) Aplica a los productos ya indexados las capas creadas desde la
+       actualización anterior, en una sola consulta por create_date. Se lee
+       desde `margen` segundos antes, porque create_date es la hora de inicio
+       de la transacción y una transacción larga puede confirmar capas con
+       fecha anterior; las capas ya aplicadas se ignoran.
+    2) Carga el historial completo de los productos que aún no tiene.
+    """
+    if indice.actualizado_hasta is not None:
+        capas = models.iter_execute_kw(db, uid, password,
+            'stock.valuation.layer', 'search_read',
+            [[('create_date', '>=', restar_segundos(indice.actualizado_hasta, margen)),
+              ('create_date', '<', hasta)]],
+            {'fields': CAMPOS_CAPA, 'order': 'create_date asc, id asc'}
+        )
+        for capa in capas:
+            if capa['product_id'][0] in indice.productos:
+                indice.agregar_capa(capa)
+
+    nuevos = [prod_id for prod_id in product_ids if prod_id not in indice.productos]
+    construir_indice_costos(models, db, uid, password, nuevos, hasta, indice)
+
+    indice.actualizado_hasta = hasta
+    indice.olvidar_capas(restar_segundos(hasta, margen))
+    return indice
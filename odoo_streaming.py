@@ -0,0 +1,177 @@
+import gzip
+import http.client
+import xmlrpc.client
+from xml.parsers import expat
+from urllib.parse import urlsplit
+
+# Bytes leídos de la respuesta por cada vuelta del parser
+TAMANO_BLOQUE = 16 * 1024
+
+
+class _DecodificadorIncremental(xmlrpc.client.Unmarshaller):
+    """
+    Unmarshaller de xmlrpc.client (mismos tipos que ServerProxy) que permite
+    retirar, mientras se parsea, los elementos ya completos del arreglo
+    resultado, en vez de esperar a close().
+    """
+    def __init__(self):
+        super().__init__()
+        self.es_arreglo = None   # True si el resultado es un arreglo
+        self.parser = expat.ParserCreate(None, None)
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+        self.parser.CharacterDataHandler = self.data
+        # Igual que ExpatParser: expat ya entrega str, sin decodificar
+        self.xml(None, None)
+
+    def start(self, tag, attrs):
+        # El primer contenedor define el tipo del resultado (un fault es struct)
+        nombre = tag.split(':')[-1]
+        if nombre in ('array', 'struct'):
+            self.es_arreglo = nombre == 'array'
+            # Ya no hace falta revisar: el resto va directo al Unmarshaller
+            self.parser.StartElementHandler = super().start
+        super().start(tag, attrs)
+
+    def feed(self, bloque):
+        self.parser.Parse(bloque, False)
+
+    def terminar(self):
+        # Cierra el parser y devuelve el resultado (lanza Fault si corresponde)
+        self.parser.Parse(b'', True)
+        return self.close()[0]
+
+    def retirar_completos(self):
+        """
+        Quita de la pila y devuelve los elementos del arreglo resultado que ya
+        se terminaron de decodificar.
+        """
+        if not self.es_arreglo or not self._marks:
+            return []
+        inicio = self._marks[0]
+        fin = self._marks[1] if len(self._marks) > 1 else len(self._stack)
+        completos = self._stack[inicio:fin]
+        del self._stack[inicio:fin]
+        # Las marcas de los contenedores abiertos se corren hacia atrás
+        for i in range(1, len(self._marks)):
+            self._marks[i] -= len(completos)
+        return completos
+
+
+class ClienteOdooStreaming:
+    """
+    Cliente XML-RPC para el endpoint /xmlrpc/2/object de Odoo con la misma
+    firma que ServerProxy para execute_kw, más iter_execute_kw, que decodifica
+    la respuesta con un parser incremental (expat) y entrega cada registro apenas se
+    termina de leer. La memoria queda acotada a un registro, no a la respuesta.
+
+    Mantiene una conexión HTTP(S) persistente; no se debe compartir entre hilos.
+    """
+    def __init__(self, url, timeout=300):
+        partes = urlsplit(url)
+        self._https = partes.scheme == 'https'
+        self._host = partes.netloc
+        self._ruta = partes.path or '/'
+        self._timeout = timeout
+        self._conexion = None
+
+    def _conectar(self):
+        if self._conexion is None:
+            clase = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            self._conexion = clase(self._host, timeout=self._timeout)
+        return self._conexion
+
+    def cerrar(self):
+        # Cierra la conexión persistente; la siguiente llamada abre una nueva
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+
+    def _enviar(self, cuerpo):
+        # Igual que Transport: un reintento si el servidor cerró la conexión
+        # persistente, y ante cualquier otro error (conexión rechazada, timeout,
+        # SSL) se cierra la conexión para que la siguiente llamada parta limpia
+        for intento in (1, 2):
+            conexion = self._conectar()
+            try:
+                conexion.request('POST', self._ruta, body=cuerpo, headers={
+                    'Content-Type': 'text/xml',
+                    'Accept-Encoding': 'gzip',
+                })
+                respuesta = conexion.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.cerrar()
+                if intento == 2:
+                    raise
+                continue
+            except Exception:
+                self.cerrar()
+                raise
+
+            if respuesta.status != 200:
+                respuesta.read()
+                self.cerrar()
+                raise xmlrpc.client.ProtocolError(
+                    self._host + self._ruta, respuesta.status, respuesta.reason,
+                    dict(respuesta.getheaders()))
+            return respuesta
+
+    def _recorrer(self, cuerpo):
+        """
+        Envía la llamada y recorre la respuesta. Produce (True, elemento) por
+        cada elemento del arreglo resultado, o una sola vez (False, valor) si
+        el resultado no es un arreglo.
+        """
+        respuesta = self._enviar(cuerpo)
+        lector = respuesta
+        if respuesta.getheader('Content-Encoding', '').lower() == 'gzip':
+            lector = gzip.GzipFile(fileobj=respuesta)
+
+        decodificador = _DecodificadorIncremental()
+        completa = False
+        try:
+            while True:
+                bloque = lector.read(TAMANO_BLOQUE)
+                if not bloque:
+                    break
+                decodificador.feed(bloque)
+                for elemento in decodificador.retirar_completos():
+                    yield True, elemento
+
+            # El resto del arreglo queda en el resultado final
+            resultado = decodificador.terminar()
+            completa = True
+            if decodificador.es_arreglo:
+                for elemento in resultado:
+                    yield True, elemento
+            else:
+                yield False, resultado
+        finally:
+            # Si el consumidor abandonó la respuesta, la conexión queda inutilizable
+            if not completa:
+                self.cerrar()
+
+    def iter_execute_kw(self, db, uid, password, modelo, metodo, args, kwargs=None):
+        """
+        Igual que execute_kw, pero produce los registros del resultado a medida
+        que se decodifican. Si el resultado no es un arreglo se produce una vez.
+        """
+        params = (db, uid, password, modelo, metodo, args) + ((kwargs,) if kwargs else ())
+        cuerpo = xmlrpc.client.dumps(params, 'execute_kw', allow_none=True).encode('utf-8')
+        for _, valor in self._recorrer(cuerpo):
+            yield valor
+
+    def execute_kw(self, db, uid, password, modelo, metodo, args, kwargs=None):
+        # Compatible con ServerProxy: devuelve el resultado completo
+        params = (db, uid, password, modelo, metodo, args) + ((kwargs,) if kwargs else ())
+        cuerpo = xmlrpc.client.dumps(params, 'execute_kw', allow_none=True).encode('utf-8')
+        elementos = []
+        escalar = None
+        es_arreglo = True
+        # Se recorre completa aunque el resultado sea escalar, para dejar libre la conexión
+        for es_elemento, valor in self._recorrer(cuerpo):
+            if es_elemento:
+                elementos.append(valor)
+            else:
+                escalar, es_arreglo = valor, False
+        return elementos if es_arreglo else escalar
@@ -0,0 +1,86 @@
+import queue
+import threading
+
+# Marca de término que el extractor deja en la cola
+_FIN = object()
+# Segundos entre reintentos al esperar espacio en la cola
+_ESPERA_COLA = 0.5
+
+
+class ErrorPipeline(Exception):
+    """
+    Falla de una de las etapas del pipeline.
+
+    - etapa:         'extraccion' o 'carga'
+    - causa:         excepción original
+    - ultimo_lote:   número del último lote confirmado en SQL Server (None si ninguno)
+    """
+    def __init__(self, etapa, causa, ultimo_lote):
+        self.etapa = etapa
+        self.causa = causa
+        self.ultimo_lote = ultimo_lote
+        super().__init__(
+            f"Error en etapa de {etapa}: {causa!r} "
+            f"(último lote confirmado: {ultimo_lote if ultimo_lote is not None else 'ninguno'})"
+        )
+
+
+def ejecutar_pipeline(lotes, cargar, max_cola=2):
+    """
+    Ejecuta extracción y carga en paralelo.
+
+    - lotes:    iterable de (numero_lote, lote). Se recorre en un hilo aparte,
+                por lo que toda la lectura desde Odoo ocurre ahí.
+    - cargar:   función(lote) que escribe y confirma el lote en SQL Server.
+                Se ejecuta en el hilo que llama.
+    - max_cola: lotes extraídos que pueden esperar carga. Con la cola llena el
+                extractor se detiene (memoria acotada).
+
+    Devuelve el número del último lote confirmado. Ante un error en cualquiera
+    de las etapas detiene ambas y lanza ErrorPipeline.
+    """
+    cola = queue.Queue(maxsize=max_cola)
+    detener = threading.Event()
+    errores = []
+
+    def encolar(elemento):
+        # put con timeout para poder abandonar si la carga se detuvo
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=_ESPERA_COLA)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def extractor():
+        try:
+            for elemento in lotes:
+                if not encolar(elemento):
+                    return
+        except BaseException as e:
+            errores.append(e)
+        finally:
+            encolar(_FIN)
+
+    hilo = threading.Thread(target=extractor, name='extraccion', daemon=True)
+    hilo.start()
+
+    ultimo_lote = None
+    try:
+        while True:
+            elemento = cola.get()
+            if elemento is _FIN:
+                break
+            numero_lote, lote = elemento
+            cargar(lote)
+            ultimo_lote = numero_lote
+    except Exception as e:
+        raise ErrorPipeline('carga', e, ultimo_lote) from e
+    finally:
+        detener.set()
+        hilo.join()
+
+    if errores:
+        raise ErrorPipeline('extraccion', errores[0], ultimo_lote) from errores[0]
+    return ultimo_lote
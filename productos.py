@@ -1,6 +1,7 @@
 import xmlrpc.client
 import pyodbc
 import time
+from odoo_streaming import ClienteOdooStreaming
 
 def cargar_configuracion(ruta):
     config = {}
@@ -28,7 +29,7 @@ password_sql = sql_config['password_sql']
 # Conexión Odoo
 common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common')
 uid = common.authenticate(db, username, password, {})
-models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+models = ClienteOdooStreaming(f'{url}/xmlrpc/2/object')
 
 # Conexión SQL Server
 conn = pyodbc.connect(
@@ -38,8 +39,8 @@ cursor = conn.cursor()
 # Inicio tiempo ejecución
 start_time = time.time()
 
-# Obtener productos desde Odoo
-productos = models.execute_kw(db, uid, password,
+# Obtener productos desde Odoo (se cargan a medida que llegan, sin esperar la respuesta completa)
+productos = models.iter_execute_kw(db, uid, password,
                               'product.product', 'search_read',
                               [[]], {'fields': ['name', 'uom_name', 'categ_id','default_code','standard_price']})
 
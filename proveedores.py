@@ -1,6 +1,7 @@
 import xmlrpc.client
 import pyodbc
 import time
+from odoo_streaming import ClienteOdooStreaming
 
 def cargar_configuracion(ruta):
     config = {}
@@ -28,7 +29,7 @@ password_sql = sql_config['password_sql']
 # Conexión Odoo
 common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common')
 uid = common.authenticate(db, username, password, {})
-models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+models = ClienteOdooStreaming(f'{url}/xmlrpc/2/object')
 
 # Conexión SQL Server
 conn = pyodbc.connect(
@@ -40,15 +41,15 @@ start_time = time.time()
 
 domain = [('supplier_rank', '>', 0)]      # o [('supplier', '=', True)] en Odoo 14+
 fields = ['id', 'name', 'phone', 'email', 'street', 'vat']
-proveedores = models.execute_kw(
+# Se cargan a medida que llegan, sin esperar la respuesta completa
+proveedores = models.iter_execute_kw(
     db, uid, password,
     'res.partner', 'search_read',
     [domain],
     {'fields': fields}
 )
-print(proveedores)
-print(f"→ Encontrados {len(proveedores)} proveedores en Odoo.")
 MAX_LEN = 50
+count = 0
 
 # 2) Insertar ó actualizar en SQL Server
 for p in proveedores:
@@ -80,10 +81,11 @@ for p in proveedores:
       # parámetros para INSERT
       pid, name, phone, email, rut, addr
     ))
+    count += 1
 
 conn.commit()
 elapsed = time.time() - start_time
-print(f"✔ {len(proveedores)} proveedores cargados/actualizados en {elapsed:.2f}s.")
+print(f"✔ {count} proveedores cargados/actualizados en {elapsed:.2f}s.")
 
 # 3) Cerrar conexión
 cursor.close()
@@ -0,0 +1,61 @@
+"""
+Pruebas sin conexión de esquema_dw.py: DDL generado y verificación de índices.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests
+"""
+import esquema_dw
+
+# Condiciones que hacen idempotente cada sentencia del DDL
+GUARDAS = (
+    'IF OBJECT_ID(',
+    'IF COL_LENGTH(',
+    'IF NOT EXISTS (SELECT 1 FROM sys.indexes',
+    'IF EXISTS (SELECT 1 FROM dbo.DIM_TIPO_MOV WHERE CLAVE_HASH IS NULL)',
+)
+
+
+def _indices_completos():
+    # Mapa sintético como el de leer_indices: PK agrupada por tabla más los IX_ declarados
+    indices = {tabla: [(f'PK_{tabla}', [columnas[0][0]], [], True)]
+               for tabla, columnas in esquema_dw.TABLAS.items()}
+    for nombre, (tabla, claves, incluidas) in esquema_dw.INDICES.items():
+        indices[tabla].append((nombre, claves, incluidas, False))
+    return indices
+
+
+def test_ddl_cada_sentencia_tiene_guarda():
+    for sentencia in esquema_dw.generar_ddl():
+        assert sentencia.startswith(GUARDAS), sentencia
+
+
+def test_ddl_crea_todas_las_tablas_e_indices():
+    ddl = '\n'.join(esquema_dw.generar_ddl())
+    for tabla in esquema_dw.TABLAS:
+        assert f"IF OBJECT_ID(N'dbo.{tabla}', N'U') IS NULL" in ddl
+    for nombre in ('IX_DIM_PERIODO_FECHA', 'IX_DIM_TIPO_MOV_CLAVE_HASH'):
+        assert f'CREATE NONCLUSTERED INDEX {nombre}' in ddl
+        assert f"WHERE name = N'{nombre}'" in ddl
+
+
+def test_verificar_indices_esquema_completo():
+    assert esquema_dw.verificar_indices(_indices_completos()) == ([], [])
+
+
+def test_verificar_indices_falta_indice_de_periodo():
+    indices = _indices_completos()
+    indices['DIM_PERIODO'] = [i for i in indices['DIM_PERIODO'] if i[0] != 'IX_DIM_PERIODO_FECHA']
+
+    faltantes, sin_indice = esquema_dw.verificar_indices(indices)
+
+    assert faltantes == ['IX_DIM_PERIODO_FECHA']
+    assert sin_indice == [('DIM_PERIODO', ['ANIO', 'MES', 'DIA', 'HORA'], ['ID'])]
+
+
+def test_verificar_columnas_detecta_clave_hash():
+    existentes = {(tabla, nombre) for tabla, columnas in esquema_dw.TABLAS.items()
+                  for nombre, _, _ in columnas}
+    assert esquema_dw.verificar_columnas(existentes) == []
+
+    existentes.discard(('DIM_TIPO_MOV', 'CLAVE_HASH'))
+    assert esquema_dw.verificar_columnas(existentes) == [('DIM_TIPO_MOV', 'CLAVE_HASH')]
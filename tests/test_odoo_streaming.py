@@ -0,0 +1,87 @@
+"""
+Pruebas de ClienteOdooStreaming contra un servidor HTTP local: el cliente
+debe quedar utilizable después de una conexión rechazada o de un timeout.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests
+"""
+import socket
+import threading
+import time
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from odoo_streaming import ClienteOdooStreaming
+
+RESULTADO = [{'id': 1, 'name': 'WH/OUT/00001'}, {'id': 2, 'name': 'WH/OUT/00002'}]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    demoras = []   # segundos de espera por respuesta, en orden
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        if self.demoras:
+            time.sleep(self.demoras.pop(0))
+        cuerpo = xmlrpc.client.dumps((RESULTADO,), methodresponse=True).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def _iniciar_servidor(puerto=0):
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), _Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _llamar(cliente):
+    return cliente.execute_kw('db', 2, 'pw', 'stock.picking', 'search_read', [[]])
+
+
+def test_recupera_tras_conexion_rechazada():
+    puerto = _puerto_libre()
+    cliente = ClienteOdooStreaming(f'http://127.0.0.1:{puerto}/xmlrpc/2/object', timeout=5)
+
+    with pytest.raises(ConnectionRefusedError):
+        _llamar(cliente)
+
+    servidor = _iniciar_servidor(puerto)
+    try:
+        assert _llamar(cliente) == RESULTADO
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_recupera_tras_timeout():
+    servidor = _iniciar_servidor()
+    _Handler.demoras = [1.0]
+    try:
+        cliente = ClienteOdooStreaming(
+            f'http://127.0.0.1:{servidor.server_address[1]}/xmlrpc/2/object', timeout=0.3)
+
+        with pytest.raises(TimeoutError):
+            _llamar(cliente)
+        assert _llamar(cliente) == RESULTADO
+        assert list(cliente.iter_execute_kw('db', 2, 'pw', 'stock.picking', 'search_read',
+                                            [[]])) == RESULTADO
+    finally:
+        _Handler.demoras = []
+        servidor.shutdown()
+        servidor.server_close()